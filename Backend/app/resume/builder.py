@@ -1,13 +1,28 @@
 # app/resume/builder.py
+import asyncio
 import hashlib
 import json
-import os
+import re
 from typing import Any, Dict, List, Optional
-from app.services.gemini_client import Gemini
-from .utils import _load_cache,_save_cache
+from app.services.gemini_client import Gemini, _sim_above
+from app.services.cache import Cache, TTL_MAP, DEFAULT_CACHE_TTL
 
-CACHE_FILE = os.path.join(".cache", "resume_cache.json")
-os.makedirs(".cache", exist_ok=True)
+# semantic-cache knobs: reuse a summary when the JD embedding is this close
+# and the skill sets mostly overlap
+SEMANTIC_SIM_THRESHOLD = 0.97
+SKILL_JACCARD_THRESHOLD = 0.8
+_SUMMARY_INDEX_KEY = "summary_index"
+
+
+def _normalize_jd(jd_text: str) -> str:
+    # whitespace/case reflows of the same JD hash to the same key
+    return " ".join(jd_text.lower().split())
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b) if (a or b) else 0.0
 
 
 class ResumeBuilder:
@@ -16,81 +31,107 @@ class ResumeBuilder:
     - JD-specific alignment is lightweight and optionally LLM-batched later
     - Professional summary generated once per JD (and cached)
     """
-    def __init__(self, llm_api_key: Optional[str] = None):
+    def __init__(self, llm_api_key: Optional[str] = None, cache: Optional[Cache] = None):
         self.gemini = Gemini(api_key=llm_api_key)
-        self._cache = _load_cache(CACHE_FILE)
+        self.cache = cache or Cache()
 
     def _project_base_key(self, repo_name: str, pushed_at: str):
-        h = hashlib.sha1(f"{repo_name}:{pushed_at}".encode()).hexdigest()[:12]
+        # blake2b at a native digest size: no sha1 setup cost, no hexdigest
+        # truncation, same key shape as the gemini-side cache keys
+        h = hashlib.blake2b(f"{repo_name}:{pushed_at}".encode(), digest_size=6).hexdigest()
         return f"proj_base:{repo_name}:{h}"
 
     def _summary_key(self, skills: List[str], jd_text: str):
-        h = hashlib.sha1((json.dumps(skills, sort_keys=True) + jd_text).encode()).hexdigest()[:12]
+        h = hashlib.blake2b(
+            (json.dumps(skills, sort_keys=True) + _normalize_jd(jd_text)).encode(),
+            digest_size=6,
+        ).hexdigest()
         return f"summary:{h}"
 
     def build_resume_sections(self, profile: Dict, jd_text: str) -> Dict:
+        return asyncio.run(self.abuild_resume_sections(profile, jd_text))
+
+    def build_many(self, profiles: List[Dict], jd_texts: List[str]) -> List[Dict]:
+        """
+        Bulk ingestion: warms the summary cache for every (profile, JD) pair
+        through one Gemini Batch submission, then assembles each resume from
+        the now-hot caches.
+        """
+        prompts: List[str] = []
+        keys: List[str] = []
+        for profile, jd_text in zip(profiles, jd_texts):
+            skills = profile.get("skills", [])
+            top_projects = sorted(
+                profile.get("projects", []),
+                key=lambda p: p.get("relevance_score", 0.0),
+                reverse=True,
+            )[:3]
+            sum_key = self._summary_key(skills, jd_text)
+            if self.cache.get(sum_key) is None:
+                prompts.append(self._summary_prompt(skills, top_projects, jd_text))
+                keys.append(sum_key)
+
+        if prompts:
+            for key, summary in zip(keys, self.gemini.batch_generate(prompts)):
+                # a failed batch item comes back as ""; don't cache it, or
+                # _asummary would serve the blank for the full summary TTL
+                if summary:
+                    self.cache.set(key, summary, ex=TTL_MAP.get("summary", DEFAULT_CACHE_TTL))
+
+        # assembly is mostly cache hits now; the residual misses (project
+        # bases) fan out concurrently instead of paying one RTT chain per pair
+        async def _assemble():
+            return list(await asyncio.gather(*(
+                self.abuild_resume_sections(profile, jd_text)
+                for profile, jd_text in zip(profiles, jd_texts)
+            )))
+
+        return asyncio.run(_assemble())
+
+    async def abuild_resume_sections(self, profile: Dict, jd_text: str) -> Dict:
         skills: List[str] = profile.get("skills", [])
         projects: List[Dict] = profile.get("projects", [])
 
         # Pick top 3 projects
         top_projects = sorted(projects, key=lambda p: p.get("relevance_score", 0.0), reverse=True)[:3]
 
-        # 1) Summary (cached per JD)
-        sum_key = self._summary_key(skills, jd_text)
-        if sum_key in self._cache:
-            summary = self._cache[sum_key]
-        else:
-            project_names = ", ".join([p.get("name") for p in top_projects if p.get("name")])
-            prompt = f"""
-You are an ATS-friendly resume writer.
-Job Description:
-{jd_text}
-
-Candidate Skills: {', '.join(skills)}
-Candidate Projects: {project_names}
-
-Task:
-- Write a crisp 3–4 line professional summary tailored to the JD.
-- Highlight the closest-matching skills and impact.
-- Keep it factual and buzzword-light.
-"""
-            summary = self.gemini.generate(prompt)
-            self._cache[sum_key] = summary
-            _save_cache(CACHE_FILE, self._cache)
-
-        # 2) Project enhancements
-        enhanced_projects: List[Dict] = []
+        # Project cache misses (summary + misses are fetched concurrently below)
+        bases: Dict[str, Dict] = {}
+        missing: List[Dict] = []
         for p in top_projects:
             name = p.get("name")
             pushed_at = p.get("pushed_at", "") or ""  # pass through from analyzer (if available)
             base_key = self._project_base_key(name, pushed_at)
 
             # JD-independent base bullets (cached once per repo version)
-            if base_key in self._cache:
-                base = self._cache[base_key]
+            base = self.cache.get(base_key)
+            if base is None:
+                missing.append(p)
             else:
-                prompt = f"""
-You are rewriting a GitHub project into resume-ready bullets (JD-independent).
-
-Project:
-Name: {name}
-Original Skills: {', '.join(p.get('skills', []))}
-Context (if any): {p.get('reasoning', '')}
+                bases[name] = base
+
+        # Summary + project batch are independent I/O → fan out
+        summary, new_bases = await asyncio.gather(
+            self._asummary(skills, top_projects, jd_text),
+            self._abatch_project_bases(missing),
+        )
+        bases.update(new_bases)
+
+        # one union-pattern scan of the JD finds every tech term from every
+        # project at once, instead of a substring probe per tech per project
+        vocab = {t.lower() for b in bases.values() for t in (b.get("tech") or []) if t}
+        jd_hits = set()
+        if vocab:
+            pat = re.compile("|".join(re.escape(t) for t in sorted(vocab, key=len, reverse=True)))
+            jd_hits = {m.group(0) for m in pat.finditer(jd_text.lower())}
 
-Write 2–4 bullets with:
-- Action verbs, outcome/impact where possible (numbers if available)
-- Technology names explicitly
-- Keep each bullet <= 20 words
-Return JSON:
-{{ "name": "{name}", "bullets": ["...","..."], "tech": ["...","..."] }}
-"""
-                base = self.gemini.generate_json(prompt, fallback={"name": name, "bullets": [], "tech": []})
-                self._cache[base_key] = base
-                _save_cache(CACHE_FILE, self._cache)
+        enhanced_projects: List[Dict] = []
+        for p in top_projects:
+            name = p.get("name")
+            base = bases.get(name) or {"name": name, "bullets": [], "tech": []}
 
             # JD-specific light alignment (rule-based to save tokens)
-            jd_lower = jd_text.lower()
-            matched = [t for t in (base.get("tech") or []) if t and t.lower() in jd_lower]
+            matched = [t for t in (base.get("tech") or []) if t and t.lower() in jd_hits]
             # Move matched tech to front of skills list; keep top 6
             aligned_skills = sorted(set((matched + (p.get("skills") or []))), key=lambda x: (x not in matched, x))[:6]
 
@@ -106,3 +147,89 @@ Return JSON:
             "skills": skills,
             "projects": enhanced_projects
         }
+
+    def _summary_prompt(self, skills: List[str], top_projects: List[Dict], jd_text: str) -> str:
+        project_names = ", ".join([p.get("name") for p in top_projects if p.get("name")])
+        return f"""
+You are an ATS-friendly resume writer.
+Job Description:
+{jd_text}
+
+Candidate Skills: {', '.join(skills)}
+Candidate Projects: {project_names}
+
+Task:
+- Write a crisp 3–4 line professional summary tailored to the JD.
+- Highlight the closest-matching skills and impact.
+- Keep it factual and buzzword-light.
+"""
+
+    async def _asummary(self, skills: List[str], top_projects: List[Dict], jd_text: str) -> str:
+        # cached per JD; short-circuits without touching the LLM
+        sum_key = self._summary_key(skills, jd_text)
+        summary = self.cache.get(sum_key)
+        if summary is not None:
+            return summary
+
+        # semantic layer: a reworded JD with near-identical meaning reuses
+        # the cached summary instead of paying another LLM call
+        jd_vec = await self.gemini.aembed(jd_text)
+        if jd_vec:
+            skills_set = set(skills)
+            index = self.cache.get(_SUMMARY_INDEX_KEY) or []
+            # similarity over the whole index in one vectorized pass, then
+            # the (cheap) skill-overlap check only on candidates
+            for i in _sim_above(jd_vec, index, SEMANTIC_SIM_THRESHOLD):
+                entry = index[i]
+                if _jaccard(skills_set, set(entry.get("skills", []))) < SKILL_JACCARD_THRESHOLD:
+                    continue
+                cached = self.cache.get(entry.get("key", ""))
+                if cached is not None:
+                    return cached
+
+        summary = await self.gemini.agenerate(self._summary_prompt(skills, top_projects, jd_text))
+        self.cache.set(sum_key, summary, ex=TTL_MAP.get("summary", DEFAULT_CACHE_TTL))
+        if jd_vec:
+            index = self.cache.get(_SUMMARY_INDEX_KEY) or []
+            index.append({"key": sum_key, "vec": jd_vec, "skills": skills})
+            self.cache.set(_SUMMARY_INDEX_KEY, index, ex=TTL_MAP.get("summary", DEFAULT_CACHE_TTL))
+        return summary
+
+    async def _abatch_project_bases(self, projects: List[Dict]) -> Dict[str, Dict]:
+        """
+        One Gemini request for all uncached projects instead of one per project.
+        Returns {name: base} and fills the per-repo cache entries.
+        """
+        if not projects:
+            return {}
+        project_blocks = []
+        for i, p in enumerate(projects, start=1):
+            project_blocks.append(
+                f"{i}. Name: {p.get('name')}\n"
+                f"   Original Skills: {', '.join(p.get('skills', []))}\n"
+                f"   Context (if any): {p.get('reasoning', '')}"
+            )
+        prompt = f"""
+You are rewriting GitHub projects into resume-ready bullets (JD-independent).
+
+Projects:
+{chr(10).join(project_blocks)}
+
+For EACH project write 2–4 bullets with:
+- Action verbs, outcome/impact where possible (numbers if available)
+- Technology names explicitly
+- Keep each bullet <= 20 words
+Return JSON (same order as input):
+{{ "projects": [ {{ "name": "...", "bullets": ["...","..."], "tech": ["...","..."] }} ] }}
+"""
+        resp = await self.gemini.agenerate_json(prompt, fallback={"projects": []})
+        returned = {b.get("name"): b for b in (resp or {}).get("projects", []) if isinstance(b, dict)}
+
+        bases: Dict[str, Dict] = {}
+        for p in projects:
+            name = p.get("name")
+            base = returned.get(name) or {"name": name, "bullets": [], "tech": []}
+            bases[name] = base
+            base_key = self._project_base_key(name, p.get("pushed_at", "") or "")
+            self.cache.set(base_key, base, ex=TTL_MAP.get("proj_base", DEFAULT_CACHE_TTL))
+        return bases
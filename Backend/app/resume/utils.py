@@ -1,17 +1,18 @@
-import json
 import os
 from typing import Any, Dict, List, Optional
 
+from app.services.cache import json_dumps, json_loads
+
 
 def _load_cache(path: str) -> Dict[str, Any]:
     if os.path.exists(path):
         try:
-            with open(path, "r") as f:
-                return json.load(f)
+            with open(path, "rb") as f:
+                return json_loads(f.read())
         except Exception:
             return {}
     return {}
 
 def _save_cache(path: str, data: Dict[str, Any]):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
\ No newline at end of file
+    with open(path, "wb") as f:
+        f.write(json_dumps(data))
@@ -0,0 +1,204 @@
+import functools
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import redis  # optional; in-memory fallback when missing
+except ImportError:
+    redis = None
+
+try:
+    import orjson  # optional; 3-10x faster than stdlib json on dict payloads
+except ImportError:
+    orjson = None
+
+
+def json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode()
+
+
+def json_loads(raw) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _decode(raw) -> Any:
+    value = json_loads(raw)
+    return None if value == _NONE_SENTINEL else value
+
+DEFAULT_CACHE_TTL = 24 * 3600  # 1 day
+
+# cached misses expire quickly so a transient 404/error heals in minutes
+# instead of poisoning an entry for the full TTL
+NEG_TTL = 300
+_NONE_SENTINEL = "__NONE__"
+
+CACHE_DB = os.path.join(".cache", "cache.sqlite")
+
+# per-category TTLs so cheap-to-rebuild entries expire sooner
+TTL_MAP = {
+    "summary": 24 * 3600,        # JD-specific summaries: 1 day
+    "proj_base": 7 * 24 * 3600,  # JD-independent project bullets: 7 days
+}
+
+
+class _SqliteStore:
+    """
+    Local fallback store behind Cache. One upsert per write instead of the
+    old full-file JSON rewrite, and entries survive restarts (WAL mode).
+    """
+
+    def __init__(self, path: str = CACHE_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv(k TEXT PRIMARY KEY, v BLOB, expires_at INTEGER)"
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn.execute("SELECT v, expires_at FROM kv WHERE k=?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and time.time() > expires_at:
+            self._conn.execute("DELETE FROM kv WHERE k=?", (key,))
+            return None
+        return value
+
+    def get_many(self, keys) -> Dict[str, bytes]:
+        # one SELECT ... IN for the whole batch instead of a query per key
+        keys = list(keys)
+        if not keys:
+            return {}
+        marks = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            f"SELECT k, v, expires_at FROM kv WHERE k IN ({marks})", keys
+        ).fetchall()
+        now = time.time()
+        out: Dict[str, bytes] = {}
+        expired = []
+        for k, v, expires_at in rows:
+            if expires_at is not None and now > expires_at:
+                expired.append((k,))
+                continue
+            out[k] = v
+        if expired:
+            self._conn.executemany("DELETE FROM kv WHERE k=?", expired)
+        return out
+
+    def set(self, key: str, raw: bytes, ttl: Optional[int]):
+        expires_at = int(time.time() + ttl) if ttl else None
+        self._conn.execute(
+            "INSERT OR REPLACE INTO kv(k, v, expires_at) VALUES(?,?,?)",
+            (key, raw, expires_at),
+        )
+
+    def delete(self, key: str):
+        self._conn.execute("DELETE FROM kv WHERE k=?", (key,))
+
+    def set_many(self, items):
+        # items: iterable of (key, raw, ttl)
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO kv(k, v, expires_at) VALUES(?,?,?)",
+            [(k, raw, int(now + ttl) if ttl else None) for k, raw, ttl in items],
+        )
+
+
+class Cache:
+    """
+    Key/value cache: Redis primary, SQLite fallback.
+    - O(1) reads/writes per key (no full-file rewrites)
+    - values are JSON-serialized, every entry carries a TTL
+    - shared across workers when Redis is configured (REDIS_URL)
+    """
+
+    def __init__(self, client: Optional[Any] = None, ttl: int = DEFAULT_CACHE_TTL):
+        self.client = client
+        if self.client is None and redis is not None and os.getenv("REDIS_URL"):
+            try:
+                self.client = redis.Redis.from_url(os.getenv("REDIS_URL"))
+                self.client.ping()
+            except Exception as e:
+                print(f"Redis unavailable, falling back to local cache: {e}")
+                self.client = None
+        self.ttl = ttl
+        self._local = None if self.client is not None else _SqliteStore()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self.client is not None:
+            try:
+                raw = self.client.get(key)
+                if raw is None:
+                    return default
+                return _decode(raw)
+            except Exception as e:
+                print(f"Cache get failed for {key}: {e}")
+                return default
+        raw = self._local.get(key)
+        if raw is None:
+            return default
+        return _decode(raw)
+
+    def mget(self, keys) -> Dict[str, Any]:
+        """Batch get: one MGET / one SELECT covers many keys; misses are absent."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        if self.client is not None:
+            try:
+                raws = self.client.mget(keys)
+                return {k: _decode(r) for k, r in zip(keys, raws) if r is not None}
+            except Exception as e:
+                print(f"Cache mget failed: {e}")
+                return {}
+        raw = self._local.get_many(keys)
+        return {k: _decode(v) for k, v in raw.items()}
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None):
+        # None is stored as a short-lived sentinel: a cached miss still
+        # short-circuits the caller but retries within minutes
+        if value is None:
+            value = _NONE_SENTINEL
+            ex = NEG_TTL
+        ttl = ex if ex is not None else self.ttl
+        if self.client is not None:
+            try:
+                self.client.set(key, json_dumps(value), ex=ttl)
+                return
+            except Exception as e:
+                print(f"Cache set failed for {key}: {e}")
+                return
+        self._local.set(key, json_dumps(value), ttl)
+
+
+_MISS = object()  # distinguishes "not cached" from a cached None
+
+
+def cached(category: str):
+    """
+    Method decorator for classes exposing `self.cache` (a Cache instance).
+    Results are keyed on category + positional args and expire per TTL_MAP.
+    Exceptions propagate without writing anything, so a transient failure
+    never poisons the cache.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = f"{category}:" + ":".join(str(a) for a in args)
+            hit = self.cache.get(key, default=_MISS)
+            if hit is not _MISS:
+                return hit
+            result = func(self, *args, **kwargs)
+            self.cache.set(key, result, ex=TTL_MAP.get(category, self.cache.ttl))
+            return result
+        return wrapper
+    return decorator
@@ -1,6 +1,8 @@
+import ast
 import os
 import httpx
 import json
+import mmap
 import tempfile
 import time
 import os
@@ -8,91 +10,281 @@ import re
 import zipfile
 import shutil
 
-from typing import Dict,List,Any,Optional
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict,List,Any,Optional,Tuple
+
+try:
+    import re2 as _regex  # optional DFA engine: linear-time multi-pattern scans
+except ImportError:
+    _regex = re
 
 def _dedupe(seq):
     return list(dict.fromkeys(seq))
 
-def _read_text(path: str) -> str:
+# one unioned pattern so each JS/TS source is scanned once, not seven times
+_JS_PAT = _regex.compile(
+    r"from\s+['\"](?P<imp_from>[^'\"]+)['\"]"
+    r"|require\(\s*['\"](?P<imp_req>[^'\"]+)['\"]\s*\)"
+    r"|function\s+(?P<fn_def>[A-Za-z0-9_]+)\s*\("
+    r"|const\s+(?P<fn_const>[A-Za-z0-9_]+)\s*=\s*\("
+    r"|(?P<fn_arrow>[A-Za-z0-9_]+)\s*=\s*\([\w\s,]*\)\s*=>"
+    r"|class\s+(?P<cls>[A-Za-z0-9_]+)"
+    r"|(?P<route>\b(?:app|router)\.(?:get|post|put|delete|patch)\s*\(\s*['\"][^'\"]+['\"])"
+)
+
+# which output bucket each named alternative feeds
+_JS_BUCKET = {
+    "imp_from": "imports",
+    "imp_req": "imports",
+    "fn_def": "functions",
+    "fn_const": "functions",
+    "fn_arrow": "functions",
+    "cls": "classes",
+    "route": "routes",
+}
+
+# bytes pattern: runs on the raw buffer before any UTF-8 decode
+_SQL_RE = _regex.compile(rb"\b(?:SELECT|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+_EXCLUDED_DIRS = frozenset({".git", "node_modules", "dist", "build", ".venv", "venv", ".mypy_cache", ".pytest_cache"})
+
+# vendored/minified bundles above this size carry no useful signals
+_MAX_TEXT_BYTES = 256_000
+
+@functools.lru_cache(maxsize=4096)
+def _read_cached(path: str, mtime_ns: int, size: int) -> bytes:
+    # keyed on (path, mtime, size) so a changed file re-reads, an unchanged
+    # one is served from memory across extractor passes
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return bytes(mm)
     except Exception:
-        return ""
+        return b""
 
-def extract_python_symbols(path: str) -> Dict:
-    import ast
-    src = _read_text(path)
-    out = {"functions": [], "classes": [], "imports": [], "routes": [], "signals": []}
-    if not src: return out
+def _read_bytes(path: str) -> bytes:
     try:
-        tree = ast.parse(src)
+        st = os.stat(path)
+    except OSError:
+        return b""
+    if st.st_size == 0 or st.st_size > _MAX_TEXT_BYTES:
+        return b""
+    return _read_cached(path, st.st_mtime_ns, st.st_size)
+
+def _read_text(path: str) -> str:
+    # single decode pass; oversized files are skipped before any allocation
+    return _read_bytes(path).decode("utf-8", errors="ignore")
+
+@functools.lru_cache(maxsize=1024)
+def _parse_python_ast(path: str, mtime_ns: int, size: int):
+    try:
+        return ast.parse(_read_cached(path, mtime_ns, size).decode("utf-8", errors="ignore"))
     except Exception:
+        return None
+
+class _PySymbolVisitor(ast.NodeVisitor):
+    """
+    Dispatches only on the node types we extract instead of walking every
+    expression node; function bodies are not descended into.
+    """
+    def __init__(self, out: Dict):
+        self.out = out
+
+    def _visit_function(self, node):
+        self.out["functions"].append(node.name)
+        for dec in node.decorator_list:
+            # structural match for @app.route(...) / @bp.route(...);
+            # no ast.unparse round-trip back to source
+            if (
+                isinstance(dec, ast.Call)
+                and isinstance(dec.func, ast.Attribute)
+                and dec.func.attr == "route"
+                and isinstance(dec.func.value, ast.Name)
+                and dec.func.value.id in ("app", "bp")
+            ):
+                self.out["routes"].append(node.name)
+        # no generic_visit: skip the (usually dominant) function body
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node):
+        self.out["classes"].append(node.name)
+        self.generic_visit(node)  # still pick up methods
+
+    def visit_Import(self, node):
+        for n in node.names:
+            self.out["imports"].append(n.name.split(".")[0])
+
+    def visit_ImportFrom(self, node):
+        if node.module:
+            self.out["imports"].append(node.module.split(".")[0])
+
+def _python_symbols_from_tree(tree, raw: bytes) -> Dict:
+    out = {"functions": [], "classes": [], "imports": [], "routes": [], "signals": []}
+    if tree is None:
         return out
-    for node in ast.walk(tree):
-        if hasattr(__import__("ast"), "FunctionDef") and isinstance(node, ast.FunctionDef):
-            out["functions"].append(node.name)
-            for dec in node.decorator_list:
-                s = ast.unparse(dec) if hasattr(ast, "unparse") else ""
-                if "app.route(" in s or "bp.route(" in s:
-                    out["routes"].append(node.name)
-        elif isinstance(node, ast.ClassDef):
-            out["classes"].append(node.name)
-        elif isinstance(node, (ast.Import,)):
-            for n in node.names: out["imports"].append(n.name.split(".")[0])
-        elif isinstance(node, (ast.ImportFrom,)):
-            if node.module: out["imports"].append(node.module.split(".")[0])
+    _PySymbolVisitor(out).visit(tree)
+    src = raw.decode("utf-8", errors="ignore")
     if "from flask" in src or "import flask" in src:
         for m in re.finditer(r"@(?:app|bp)\.route\(['\"][^'\"]+['\"]", src):
             out["routes"].append(m.group(0))
-    if re.search(r"\bSELECT\b|\bINSERT\b|\bUPDATE\b|\bDELETE\b", src, re.IGNORECASE):
+    if _SQL_RE.search(raw):
         out["signals"].append("uses_sql_queries")
     return {k: _dedupe(v) for k, v in out.items()}
 
-def extract_js_ts_symbols(path: str) -> Dict:
-    src = _read_text(path)
+def _python_symbols_from_bytes(raw: bytes) -> Dict:
+    if not raw or len(raw) > _MAX_TEXT_BYTES or b"\x00" in raw[:1024]:
+        return {"functions": [], "classes": [], "imports": [], "routes": [], "signals": []}
+    try:
+        tree = ast.parse(raw.decode("utf-8", errors="ignore"))
+    except Exception:
+        tree = None
+    return _python_symbols_from_tree(tree, raw)
+
+def extract_python_symbols(path: str) -> Dict:
+    out = {"functions": [], "classes": [], "imports": [], "routes": [], "signals": []}
+    try:
+        st = os.stat(path)
+    except OSError:
+        return out
+    if st.st_size == 0 or st.st_size > _MAX_TEXT_BYTES:
+        return out
+    raw = _read_cached(path, st.st_mtime_ns, st.st_size)
+    if not raw: return out
+    tree = _parse_python_ast(path, st.st_mtime_ns, st.st_size)
+    return _python_symbols_from_tree(tree, raw)
+
+def _js_symbols_from_bytes(raw: bytes, base: str) -> Dict:
     out = {"functions": [], "classes": [], "imports": [], "routes": [], "signals": []}
-    if not src: return out
-    out["imports"].extend([m.group(1) for m in re.finditer(r"from\s+['\"]([^'\"]+)['\"]", src)])
-    out["imports"].extend([m.group(1) for m in re.finditer(r"require\(\s*['\"]([^'\"]+)['\"]\s*\)", src)])
-    out["functions"].extend([m.group(1) for m in re.finditer(r"function\s+([A-Za-z0-9_]+)\s*\(", src)])
-    out["functions"].extend([m.group(1) for m in re.finditer(r"const\s+([A-Za-z0-9_]+)\s*=\s*\(", src)])
-    out["functions"].extend([m.group(1) for m in re.finditer(r"([A-Za-z0-9_]+)\s*=\s*\([\w\s,]*\)\s*=>", src)])
-    out["classes"].extend([m.group(1) for m in re.finditer(r"class\s+([A-Za-z0-9_]+)\s*", src)])
-    for m in re.finditer(r"\b(app|router)\.(get|post|put|delete|patch)\s*\(\s*['\"][^'\"]+['\"]", src):
-        out["routes"].append(m.group(0))
-    if re.search(r"\bSELECT\b|\bINSERT\b|\bUPDATE\b|\bDELETE\b", src, re.IGNORECASE):
+    if base.endswith((".min.js", ".map")) or ".bundle." in base:
+        return out
+    if not raw or len(raw) > _MAX_TEXT_BYTES or b"\x00" in raw[:1024]:
+        return out
+    # minified/generated signal: a >2KB line inside the first 4KB
+    if max(map(len, raw[:4096].split(b"\n")), default=0) > 2048:
+        return out
+    if _SQL_RE.search(raw):
         out["signals"].append("uses_sql_queries")
+    src = raw.decode("utf-8", errors="ignore")
+    for m in _JS_PAT.finditer(src):
+        group = m.lastgroup
+        if group:
+            out[_JS_BUCKET[group]].append(m.group(group))
     return {k: _dedupe(v) for k, v in out.items()}
 
-def summarize_repo_code(root: str) -> Dict:
+def extract_js_ts_symbols(path: str) -> Dict:
+    return _js_symbols_from_bytes(_read_bytes(path), os.path.basename(path))
+
+def _extract_one(job: Tuple[str, str]) -> Tuple[str, Dict]:
+    # top-level so it can be pickled into worker processes
+    lang, fp = job
+    if lang == "python":
+        return lang, extract_python_symbols(fp)
+    return lang, extract_js_ts_symbols(fp)
+
+def _extract_one_bytes(job: Tuple[str, str, bytes]) -> Tuple[str, Dict]:
+    # zip-entry variant: the bytes travel to the worker, not a path
+    lang, base, raw = job
+    if lang == "python":
+        return lang, _python_symbols_from_bytes(raw)
+    return lang, _js_symbols_from_bytes(raw, base)
+
+# one pool for every scan: per-call pools oversubscribe the CPU when many
+# repos are scanned concurrently, and fork()ing from a multi-threaded
+# parent (the analyzer runs scans via to_thread) is deadlock-prone — the
+# spawn context sidesteps inherited locks
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _shared_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+def _summarize(results) -> Dict:
     code = {
         "python": {"files": 0, "functions": [], "classes": [], "imports": [], "routes": [], "signals": []},
         "js_ts": {"files": 0, "functions": [], "classes": [], "imports": [], "routes": [], "signals": []},
     }
+
+    # ordered-set accumulation: one dict insert per match, no deferred
+    # dedupe pass over the concatenated lists
+    buckets = {
+        lang: {k: {} for k in ("functions", "classes", "imports", "routes", "signals")}
+        for lang in code
+    }
+    for lang, sym in results:
+        code[lang]["files"] += 1
+        for k, bucket in buckets[lang].items():
+            for v in sym.get(k, ()):
+                bucket[v] = None
+
+    for lang, by_key in buckets.items():
+        for k, bucket in by_key.items():
+            code[lang][k] = list(bucket)
+
+    return code
+
+def summarize_repo_code(root: str) -> Dict:
+    # gather files first, then spread the CPU-heavy parsing over processes
+    jobs: List[Tuple[str, str]] = []
     for dirpath, dirnames, filenames in os.walk(root):
-        
-        if any(seg in dirpath for seg in (".git", "node_modules", "dist", "build", ".venv", "venv", ".mypy_cache", ".pytest_cache")):
+
+        # prune in place so excluded trees are never descended at all
+        dirnames[:] = [d for d in dirnames if d not in _EXCLUDED_DIRS]
+
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                fn = entry.name
+                if fn.endswith(".py"):
+                    if entry.is_file(follow_symlinks=False):
+                        jobs.append(("python", entry.path))
+                elif fn.endswith((".js", ".ts", ".jsx", ".tsx")):
+                    if entry.is_file(follow_symlinks=False):
+                        jobs.append(("js_ts", entry.path))
+
+    if not jobs:
+        return _summarize(())
+
+    # ast.parse holds the GIL, so threads don't help; processes do
+    if len(jobs) > 64:
+        results = _shared_pool().map(_extract_one, jobs, chunksize=32)
+    else:
+        results = map(_extract_one, jobs)
+
+    return _summarize(results)
+
+def summarize_repo_zip(zf: zipfile.ZipFile) -> Dict:
+    """
+    Same summary as summarize_repo_code, read straight out of the
+    zipball: entries are decompressed on demand, nothing is extracted to
+    disk and there is no tree to rmtree afterwards.
+    """
+    jobs: List[Tuple[str, str, bytes]] = []
+    for info in zf.infolist():
+        if info.is_dir() or info.file_size == 0 or info.file_size > _MAX_TEXT_BYTES:
             continue
+        parts = info.filename.split("/")
+        if any(p in _EXCLUDED_DIRS for p in parts[:-1]):
+            continue
+        base = parts[-1]
+        if base.endswith(".py"):
+            jobs.append(("python", base, zf.read(info)))
+        elif base.endswith((".js", ".ts", ".jsx", ".tsx")):
+            jobs.append(("js_ts", base, zf.read(info)))
+
+    if not jobs:
+        return _summarize(())
+
+    if len(jobs) > 64:
+        results = _shared_pool().map(_extract_one_bytes, jobs, chunksize=32)
+    else:
+        results = map(_extract_one_bytes, jobs)
 
-        for fn in filenames:
-            fp = os.path.join(dirpath, fn)
-            if fn.endswith(".py"):
-                code["python"]["files"] += 1
-                sym = extract_python_symbols(fp)
-                for k in ("functions", "classes", "imports", "routes"):
-                    code["python"][k].extend(sym.get(k, []))
-                code["python"]["signals"].extend(sym.get("signals", []))
-            elif fn.endswith((".js", ".ts", ".jsx", ".tsx")):
-                code["js_ts"]["files"] += 1
-                sym = extract_js_ts_symbols(fp)
-                for k in ("functions", "classes", "imports", "routes"):
-                    code["js_ts"][k].extend(sym.get(k, []))
-                code["js_ts"]["signals"].extend(sym.get("signals", []))
-    
-    for lang in code:
-        for k, v in code[lang].items():
-            if isinstance(v, list):
-                code[lang][k] = _dedupe(v)
-    
-    return code
\ No newline at end of file
+    return _summarize(results)
\ No newline at end of file
@@ -0,0 +1,124 @@
+import re
+import tomllib
+from typing import Callable, Dict, List
+
+from .cache import json_loads
+
+# compiled once at import; these run per line inside the parsers
+_PLAIN_RE = re.compile(r"[A-Za-z0-9_\-.]+")
+# one multiline pass over requirements-style files: anchors at line start,
+# requires an alphanumeric lead so comments, -r includes and --flags fall out
+_REQ_LINE_RE = re.compile(r"(?m)^[ \t]*([A-Za-z0-9][A-Za-z0-9_.\-]*)")
+_ARTIFACT_RE = re.compile(r"<artifactId>(.*?)</artifactId>")
+_GRADLE_COORD_RE = re.compile(r"['\"]([A-Za-z0-9_.\-]+:[A-Za-z0-9_.\-]+)['\"]")
+# go.mod require entries, single-line or block form: "module/path v1.2.3"
+_GO_MOD_RE = re.compile(r"(?m)^(?:require\s+)?[ \t]*([A-Za-z0-9][\w.\-]*(?:/[\w.\-]+)+)\s+v\d")
+# poetry.lock / Cargo.lock [[package]] name lines; only the names matter,
+# so one findall beats a full TOML parse on multi-hundred-KB lockfiles
+_LOCK_NAME_RE = re.compile(r'(?m)^name = "([^"]+)"')
+# yarn.lock entry headers: `lodash@^4:` / `"@babel/core@^7.0", ...:`
+_YARN_ENTRY_RE = re.compile(r'(?m)^"?(@?[A-Za-z0-9._\-]+(?:/[A-Za-z0-9._\-]+)?)@')
+
+
+def _parse_package_json(content: str) -> List[str]:
+    try:
+        data = json_loads(content)
+    except Exception:
+        return []
+    return list(data.get("dependencies", {}).keys()) + list(data.get("devDependencies", {}).keys())
+
+
+def _parse_requirements(content: str) -> List[str]:
+    # single C-level regex scan instead of a Python split per line
+    return _REQ_LINE_RE.findall(content)
+
+
+def _parse_pyproject(content: str) -> List[str]:
+    try:
+        data = tomllib.loads(content)
+    except Exception:
+        return []
+    deps = []
+    for spec in data.get("project", {}).get("dependencies", []):
+        m = _PLAIN_RE.match(spec)
+        if m:
+            deps.append(m.group(0))
+    poetry = data.get("tool", {}).get("poetry", {}).get("dependencies", {})
+    deps.extend(k for k in poetry if k != "python")
+    return deps
+
+
+def _parse_cargo(content: str) -> List[str]:
+    try:
+        data = tomllib.loads(content)
+    except Exception:
+        return []
+    deps: List[str] = []
+    for section in ("dependencies", "dev-dependencies", "build-dependencies"):
+        deps.extend(data.get(section, {}))
+    deps.extend(data.get("workspace", {}).get("dependencies", {}))
+    return deps
+
+
+def _parse_go_mod(content: str) -> List[str]:
+    # keep the final path segment — that's the import name JD skill
+    # matching can actually hit, not the full module path
+    return [m.rsplit("/", 1)[-1] for m in _GO_MOD_RE.findall(content)]
+
+
+def _parse_lock_names(content: str) -> List[str]:
+    return _LOCK_NAME_RE.findall(content)
+
+
+def _parse_yarn_lock(content: str) -> List[str]:
+    return _YARN_ENTRY_RE.findall(content)
+
+
+def _parse_maven_gradle(content: str) -> List[str]:
+    deps = []
+    for line in content.splitlines():
+        if "<artifactId>" in line:
+            m = _ARTIFACT_RE.search(line)
+            if m:
+                deps.append(m.group(1).strip())
+        elif "implementation" in line or "api " in line:
+            g = _GRADLE_COORD_RE.search(line)
+            if g:
+                deps.append(g.group(1))
+    return deps
+
+
+class DependencyExtractor:
+    """
+    Maps manifest filenames to dedicated parsers and returns package names.
+    Unknown-but-interesting manifests fall back to a presence marker so the
+    skill matching still sees the ecosystem.
+    """
+
+    DEP_FILES = (
+        "package.json", "requirements.txt", "pyproject.toml", "Pipfile",
+        "pom.xml", "build.gradle", "Cargo.toml", "go.mod",
+        "poetry.lock", "Cargo.lock", "yarn.lock",
+    )
+
+    PARSERS: Dict[str, Callable[[str], List[str]]] = {
+        "package.json": _parse_package_json,
+        "requirements.txt": _parse_requirements,
+        "Pipfile": _parse_requirements,
+        "pyproject.toml": _parse_pyproject,
+        "pom.xml": _parse_maven_gradle,
+        "build.gradle": _parse_maven_gradle,
+        "Cargo.toml": _parse_cargo,
+        "go.mod": _parse_go_mod,
+        "poetry.lock": _parse_lock_names,
+        "Cargo.lock": _parse_lock_names,
+        "yarn.lock": _parse_yarn_lock,
+    }
+
+    def extract_from_file(self, filename: str, content: str) -> List[str]:
+        parser = self.PARSERS.get(filename)
+        if parser is not None:
+            return parser(content)
+        if filename in self.DEP_FILES:
+            return [f"{filename} present"]
+        return []
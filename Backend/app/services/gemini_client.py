@@ -1,40 +1,257 @@
+import asyncio
+import atexit
+import functools
 import hashlib
 import json
 import os
+import select
 import subprocess
+import time
 from typing import Any, Dict, List, Optional
 
+from app.services.cache import NEG_TTL, _SqliteStore, json_dumps, json_loads
 
-CACHE_FILE = os.path.join(".cache", "gemini_cache.json")
-os.makedirs(".cache", exist_ok=True)
+try:
+    import orjson  # C encoder; stdlib json stays as the fallback
+except ImportError:
+    orjson = None
 
-def _load_cache(path: str) -> Dict[str, Any]:
-    if os.path.exists(path):
+try:
+    import numpy as np  # vectorizes the semantic-index scans when present
+except ImportError:
+    np = None
+
+
+CACHE_DB = os.path.join(".cache", "gemini_cache.sqlite")
+
+def _dumps_sorted(obj: Any) -> bytes:
+    # bytes out: hash callers feed this straight into hashlib, no .encode()
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True).encode()
+
+# only what the scoring prompt actually reasons over; owner/pushed_at etc.
+# are dead tokens to the model
+_LLM_FIELDS = frozenset({
+    "name", "description", "languages", "dependencies",
+    "maturity", "readme_excerpt", "code_summary",
+})
+_README_PROMPT_CAP = 2000
+_CODE_LIST_CAP = 40
+
+def _llm_payload(fp: Dict, idx: int) -> Dict:
+    """Slim prompt view of a fingerprint with bounded text/list sizes."""
+    slim = {k: v for k, v in fp.items() if k in _LLM_FIELDS}
+    excerpt = slim.get("readme_excerpt")
+    if excerpt and len(excerpt) > _README_PROMPT_CAP:
+        slim["readme_excerpt"] = excerpt[:_README_PROMPT_CAP]
+    code = slim.get("code_summary")
+    if isinstance(code, dict):
+        slim["code_summary"] = {
+            lang: {k: (v[:_CODE_LIST_CAP] if isinstance(v, list) else v) for k, v in summary.items()}
+            for lang, summary in code.items()
+            if isinstance(summary, dict)
+        }
+    slim["idx"] = idx
+    return slim
+
+# greedy prompt packing for batch scoring: ~4 chars/token heuristic plus a
+# per-repo response reserve. Budget stays far below the model context but
+# collapses dozens of fingerprints into one request, trading RPM pressure
+# for TPM pressure.
+_TOKEN_BUDGET = 100_000
+_RESP_TOKENS_PER_REPO = 300
+
+@functools.lru_cache(maxsize=8192)
+def _version_hash(owner: str, name: str, pushed_at: str) -> str:
+    return hashlib.blake2b(f"{owner}/{name}@{pushed_at}".encode(), digest_size=6).hexdigest()
+
+def _fp_hash(fp: Dict) -> str:
+    """
+    Short content key for a fingerprint. Fingerprints are versioned by
+    pushed_at everywhere else in the pipeline, so when it is present the
+    hash is memoized on (owner, name, pushed_at) and the O(size)
+    json.dumps(sort_keys=True) re-serialization is skipped entirely.
+    """
+    pushed_at = fp.get("pushed_at")
+    if pushed_at:
+        return _version_hash(fp.get("owner", ""), fp.get("name", ""), pushed_at)
+    return hashlib.blake2b(_dumps_sorted(fp), digest_size=6).hexdigest()
+
+def _est_tokens(fp: Dict) -> int:
+    return len(json_dumps(fp)) // 4 + _RESP_TOKENS_PER_REPO
+
+def _pack_chunks(fingerprints: List[Dict], token_budget: int = _TOKEN_BUDGET):
+    chunk: List[Dict] = []
+    used = 0
+    for fp in fingerprints:
+        cost = _est_tokens(fp)
+        if chunk and used + cost > token_budget:
+            yield chunk
+            chunk, used = [], 0
+        chunk.append(fp)
+        used += cost
+    if chunk:
+        yield chunk
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = sum(x * x for x in a) ** 0.5
+    nb = sum(x * x for x in b) ** 0.5
+    return dot / (na * nb) if na and nb else 0.0
+
+def _sim_above(vec: List[float], entries: List[Dict], threshold: float) -> List[int]:
+    """
+    Indices of entries whose "vec" cosine-matches vec at or above threshold,
+    best first. With numpy the whole index collapses into one matrix-vector
+    product instead of a Python loop per stored embedding.
+    """
+    if not vec or not entries:
+        return []
+    if np is not None:
         try:
-            with open(path, "r") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+            mat = np.asarray([e.get("vec") or [] for e in entries], dtype=np.float32)
+            q = np.asarray(vec, dtype=np.float32)
+            norms = np.linalg.norm(mat, axis=1) * np.linalg.norm(q)
+            sims = np.divide(mat @ q, norms, out=np.zeros(len(entries), dtype=np.float32),
+                             where=norms > 0)
+            order = np.argsort(-sims)
+            return [int(i) for i in order if sims[i] >= threshold]
+        except ValueError:
+            pass  # ragged vectors (mixed embed models) → scalar path
+    sims = sorted(
+        ((i, _cosine(vec, e.get("vec", []))) for i, e in enumerate(entries)),
+        key=lambda t: -t[1],
+    )
+    return [i for i, s in sims if s >= threshold]
 
-def _save_cache(path: str, data: Dict[str, Any]):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+def _extract_json(s: str) -> Optional[str]:
+    """
+    One linear scan for the first balanced {...} or [...] block, tracking
+    string/escape state so braces inside strings don't count. Handles the
+    usual LLM output shapes (markdown fences, prose around the JSON) and,
+    unlike a find('{')/rfind('}') probe, recovers top-level arrays too.
+    """
+    start = -1
+    depth = 0
+    in_str = False
+    escaped = False
+    for i, ch in enumerate(s):
+        if start == -1:
+            if ch in "{[":
+                start = i
+                depth = 1
+            continue
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return s[start:i+1]
+    return None
+
+def _loads(s: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
 
 def _json_safely(s: str, fallback: Any = None):
+    candidate = _extract_json(s)
+    if candidate is None:
+        return fallback
     try:
-        return json.loads(s)
+        return _loads(candidate)
     except Exception:
-        # naive fix: extract first {...}
-        start = s.find("{")
-        end = s.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            try:
-                return json.loads(s[start:end+1])
-            except Exception:
-                return fallback
         return fallback
 
+class _ArrayItemScanner:
+    """
+    Incremental parser for a streamed top-level JSON array of objects.
+    feed() returns every element completed by the new text, so a consumer
+    can act on early entries while the rest of the response is still
+    generating; a truncated stream still yields the items that finished.
+    """
+    def __init__(self):
+        self._in_array = False
+        self._depth = 0
+        self._in_str = False
+        self._escaped = False
+        self._buf: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        done: List[Any] = []
+        for ch in text:
+            if not self._in_array:
+                if ch == "[":
+                    self._in_array = True
+                continue
+            if not self._buf:
+                # between items: skip separators until the next object opens
+                if ch == "{":
+                    self._buf.append(ch)
+                    self._depth = 1
+                continue
+            self._buf.append(ch)
+            if self._in_str:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        done.append(_loads("".join(self._buf)))
+                    except Exception:
+                        pass
+                    self._buf = []
+        return done
+
+# provider quota the token bucket paces uncached LLM calls against
+_LLM_QPM = float(os.environ.get("GEMINI_QPM", "60"))
+
+class _AsyncTokenBucket:
+    """
+    Async rate limiter: `rate` tokens/second refill up to `capacity`.
+    Callers sleep on the event loop until a token is available, so other
+    coroutines (GitHub fetches, streams) keep running while LLM calls
+    wait their turn.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
 class Gemini:
     """
     Single integration point. Business code never touches API/CLI.
@@ -45,15 +262,64 @@ class Gemini:
       - generate_json(text) -> dict or list
       - batch_score_repos(jd_text, fingerprints) -> List[dict]
     """
-    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.0-flash",
+                 semantic_threshold: float = 0.97):
         self.api_key = api_key
         self.model = model
-        self._cache = _load_cache(CACHE_FILE)
+        # cosine similarity above which two JDs share one score-cache lane
+        self.semantic_threshold = semantic_threshold
+        # per-key sqlite store: one upsert per response instead of a full
+        # rewrite of the old gemini_cache.json on every miss
+        self._store = _SqliteStore(CACHE_DB)
+        # write-behind buffer: single-entry writes land here and hit sqlite
+        # in one executemany once the buffer grows or goes stale. A crash
+        # loses at most the flush window; atexit covers clean shutdown.
+        self._dirty: Dict[str, Any] = {}
+        self._last_flush = time.monotonic()
+        atexit.register(self._flush)
+        # persistent CLI process (see _ensure_cli_proc); spawning a fresh
+        # `gemini` per prompt pays interpreter/auth/TLS startup every call
+        self._cli_proc = None
+        self._cli_repl_broken = False
+        self._cli_buf = b""  # leftover stdout bytes between repl reads
+        atexit.register(self._kill_cli_proc)
+        # paces uncached model calls at the provider QPM without blocking
+        # the loop; cache hits never touch it
+        self._llm_bucket = _AsyncTokenBucket(rate=_LLM_QPM / 60.0, capacity=max(1.0, _LLM_QPM / 60.0))
         self._api_client = None
         if api_key:
             from google.genai import Client  # lazy import
             self._api_client = Client(api_key=api_key)
 
+    # ---------- cache ----------
+    _FLUSH_MAX_DIRTY = 64
+    _FLUSH_MAX_AGE = 2.0  # seconds
+
+    def _cache_get(self, key: str) -> Any:
+        if key in self._dirty:
+            return self._dirty[key]
+        raw = self._store.get(key)
+        return None if raw is None else json_loads(raw)
+
+    def _cache_put(self, key: str, value: Any):
+        self._dirty[key] = value
+        if len(self._dirty) > self._FLUSH_MAX_DIRTY or time.monotonic() - self._last_flush > self._FLUSH_MAX_AGE:
+            self._flush()
+
+    def _flush(self):
+        if self._dirty:
+            self._store.set_many((k, json_dumps(v), None) for k, v in self._dirty.items())
+            self._dirty.clear()
+        self._last_flush = time.monotonic()
+
+    def _cache_put_many(self, items, ttl: Optional[int] = None):
+        # items: iterable of (key, value); single executemany transaction
+        self._store.set_many((k, json_dumps(v), ttl) for k, v in items)
+
+    def _cache_del(self, key: str):
+        self._dirty.pop(key, None)
+        self._store.delete(key)
+
     # ---------- low-level ----------
     def _run_api(self, prompt: str) -> str:
         resp = self._api_client.models.generate_content(
@@ -62,23 +328,146 @@ class Gemini:
         )
         return (resp.text or "").strip()
 
+    _CLI_SENTINEL = "<<<EOT>>>"
+    _CLI_HANDSHAKE_TIMEOUT = 5.0   # seconds to prove the repl speaks our protocol
+    _CLI_READ_TIMEOUT = 120.0      # per-prompt ceiling before falling back
+
+    def _readline_timeout(self, proc, timeout: float) -> Optional[str]:
+        """
+        One stdout line, or None on timeout, or "" on EOF. Reads the raw
+        fd through an explicit buffer — proc.stdout's TextIOWrapper would
+        prefetch past the line, leaving buffered data select() can't see.
+        """
+        fd = proc.stdout.fileno()
+        deadline = time.monotonic() + max(timeout, 0)
+        while b"\n" not in self._cli_buf:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return ""
+            self._cli_buf += chunk
+        line, self._cli_buf = self._cli_buf.split(b"\n", 1)
+        return line.decode("utf-8", errors="ignore") + "\n"
+
+    def _ensure_cli_proc(self):
+        """
+        One long-lived `gemini repl` process, restarted if it died. The
+        repl protocol (echo the sentinel line after each response) is not
+        something every CLI speaks, so a spawned child must pass a quick
+        sentinel handshake before being trusted — a child that stays
+        silent or prints an interactive prompt is killed within the
+        timeout instead of hanging the pipeline on a blocking read.
+        """
+        if self._cli_proc is not None and self._cli_proc.poll() is None:
+            return self._cli_proc
+        if self._cli_repl_broken:
+            return None
+        proc = None
+        self._cli_buf = b""
+        try:
+            proc = subprocess.Popen(
+                ["gemini", "repl", "--model", self.model],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                text=True, bufsize=1,
+            )
+            proc.stdin.write(self._CLI_SENTINEL + "\n")
+            proc.stdin.flush()
+            deadline = time.monotonic() + self._CLI_HANDSHAKE_TIMEOUT
+            while True:
+                line = self._readline_timeout(proc, deadline - time.monotonic())
+                if line is None or line == "":
+                    raise RuntimeError("repl handshake timed out")
+                if line.rstrip("\n") == self._CLI_SENTINEL:
+                    break
+            self._cli_proc = proc
+        except Exception as e:
+            print(f"gemini repl unavailable ({e}); using per-call spawn")
+            self._cli_repl_broken = True
+            self._cli_proc = None
+            if proc is not None:
+                try:
+                    proc.terminate()
+                except Exception:
+                    pass
+        return self._cli_proc
+
+    def _kill_cli_proc(self):
+        proc, self._cli_proc = self._cli_proc, None
+        if proc is not None:
+            try:
+                proc.terminate()
+            except Exception:
+                pass
+
     def _run_cli(self, prompt: str) -> str:
-        # Expecting: `gemini --model gemini-2.0-flash --text "<prompt>"`
+        # Preferred path: write to the persistent REPL and read until the
+        # sentinel, amortizing process startup across all prompts.
+        proc = self._ensure_cli_proc()
+        if proc is not None:
+            try:
+                proc.stdin.write(prompt + "\n" + self._CLI_SENTINEL + "\n")
+                proc.stdin.flush()
+                lines = []
+                deadline = time.monotonic() + self._CLI_READ_TIMEOUT
+                while True:
+                    line = self._readline_timeout(proc, deadline - time.monotonic())
+                    if line is None:
+                        raise RuntimeError("repl read timed out")
+                    if line == "":
+                        raise RuntimeError("repl closed stdout")
+                    if line.rstrip("\n") == self._CLI_SENTINEL:
+                        return "".join(lines).strip()
+                    lines.append(line)
+            except Exception as e:
+                print(f"gemini repl unavailable ({e}); using per-call spawn")
+                self._cli_repl_broken = True
+                self._kill_cli_proc()
+
+        # Fallback: `gemini --model gemini-2.0-flash --text "<prompt>"`
         # If you use a different CLI, adjust here.
         cmd = ["gemini", "--model", self.model, "--text", prompt]
         out = subprocess.check_output(cmd, text=True)
         return out.strip()
 
+    @staticmethod
+    def _raw_key(prompt: str) -> str:
+        return f"raw:{hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()}"
+
     def _call(self, prompt: str) -> str:
-        key = f"raw:{hashlib.sha1(prompt.encode()).hexdigest()}"
-        if key in self._cache:
-            return self._cache[key]
+        key = self._raw_key(prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         if self._api_client:
             out = self._run_api(prompt)
         else:
             out = self._run_cli(prompt)
-        self._cache[key] = out
-        _save_cache(CACHE_FILE, self._cache)
+        self._cache_put(key, out)
+        return out
+
+    async def _run_api_async(self, prompt: str) -> str:
+        resp = await self._api_client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+        )
+        return (resp.text or "").strip()
+
+    async def _acall(self, prompt: str) -> str:
+        key = self._raw_key(prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        await self._llm_bucket.acquire()
+        if self._api_client:
+            out = await self._run_api_async(prompt)
+        else:
+            out = await asyncio.to_thread(self._run_cli, prompt)
+        self._cache_put(key, out)
         return out
 
     # ---------- public ----------
@@ -87,53 +476,294 @@ class Gemini:
 
     def generate_json(self, prompt: str, fallback: Any = None) -> Any:
         raw = self._call(prompt)
-        parsed = _json_safely(raw, fallback=fallback)
-        return parsed if parsed is not None else fallback
+        parsed = _json_safely(raw)
+        if parsed is None:
+            # unparseable/truncated reply: evict the raw entry so a retry
+            # re-asks the model instead of replaying the bad response
+            self._cache_del(self._raw_key(prompt))
+            return fallback
+        return parsed
+
+    async def agenerate(self, prompt: str) -> str:
+        return await self._acall(prompt)
+
+    async def agenerate_json(self, prompt: str, fallback: Any = None) -> Any:
+        raw = await self._acall(prompt)
+        parsed = _json_safely(raw)
+        if parsed is None:
+            self._cache_del(self._raw_key(prompt))
+            return fallback
+        return parsed
+
+    async def astream_generate(self, prompt: str):
+        """Yields response text increments (API mode only)."""
+        await self._llm_bucket.acquire()
+        async for chunk in await self._api_client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+        ):
+            if chunk.text:
+                yield chunk.text
+
+    async def _astream_json_list(self, prompt: str, fallback: Any = None) -> Any:
+        """
+        Streams a response expected to be a JSON array and parses elements
+        as they complete, instead of waiting for the full body and lexing
+        it in one go. Falls back to the unary call on stream errors; the
+        joined text lands in the same raw-response cache as _acall.
+        """
+        key = self._raw_key(prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return _json_safely(cached, fallback=fallback)
+        scanner = _ArrayItemScanner()
+        items: List[Any] = []
+        pieces: List[str] = []
+        try:
+            async for piece in self.astream_generate(prompt):
+                pieces.append(piece)
+                items.extend(scanner.feed(piece))
+        except Exception as e:
+            print(f"Streaming failed ({e}); using unary call")
+            return await self.agenerate_json(prompt, fallback=fallback)
+        if not items:
+            # nothing parsed out of the stream: leave the cache untouched so
+            # the next call re-asks instead of replaying the truncated text
+            return fallback
+        self._cache_put(key, "".join(pieces))
+        return items
+
+    async def aembed(self, text: str, model: str = "text-embedding-004") -> Optional[List[float]]:
+        """Embedding vector for semantic cache lookups; None without API access."""
+        if not self._api_client:
+            return None
+        try:
+            resp = await self._api_client.aio.models.embed_content(model=model, contents=text)
+            return list(resp.embeddings[0].values)
+        except Exception as e:
+            print(f"Embedding failed: {e}")
+            return None
+
+    def embed(self, text: str, model: str = "text-embedding-004") -> Optional[List[float]]:
+        """Sync variant of aembed for non-async call sites."""
+        if not self._api_client:
+            return None
+        try:
+            resp = self._api_client.models.embed_content(model=model, contents=text)
+            return list(resp.embeddings[0].values)
+        except Exception as e:
+            print(f"Embedding failed: {e}")
+            return None
+
+    def _jd_key(self, jd_text: str) -> str:
+        """
+        Stable short key for a JD. Whitespace/case reflows hash identically;
+        with API access, a JD whose embedding is within semantic_threshold
+        of a previously seen one is aliased onto that JD's key, so the
+        per-repo score cache survives small JD rewordings.
+        """
+        norm = " ".join(jd_text.lower().split())
+        exact = hashlib.blake2b(norm.encode(), digest_size=5).hexdigest()
+        alias = self._cache_get(f"jd_alias:{exact}")
+        if alias:
+            return alias
+        return self._jd_key_from_vec(exact, self.embed(norm))
+
+    async def _ajd_key(self, jd_text: str) -> str:
+        """Async _jd_key: the embedding RTT awaits instead of stalling the loop."""
+        norm = " ".join(jd_text.lower().split())
+        exact = hashlib.blake2b(norm.encode(), digest_size=5).hexdigest()
+        alias = self._cache_get(f"jd_alias:{exact}")
+        if alias:
+            return alias
+        return self._jd_key_from_vec(exact, await self.aembed(norm))
+
+    def _jd_key_from_vec(self, exact: str, vec: Optional[List[float]]) -> str:
+        if vec:
+            index = self._cache_get("jd_index") or []
+            matches = _sim_above(vec, index, self.semantic_threshold)
+            if matches:
+                key = index[matches[0]]["key"]
+                self._cache_put(f"jd_alias:{exact}", key)
+                return key
+            index.append({"key": exact, "vec": vec})
+            self._cache_put("jd_index", index)
+        self._cache_put(f"jd_alias:{exact}", exact)
+        return exact
 
     # ---------- higher-level batching ----------
-    def batch_score_repos(self, jd_text: str, fingerprints: List[Dict], batch_id: str = "", batch_size: int = 5) -> List[Dict]:
+    def batch_generate(self, prompts: List[str]) -> List[str]:
+        """
+        Bulk, non-interactive path. Cache-miss prompts are submitted through
+        the Gemini Batch API when available (cheaper tokens, no RPM
+        pressure), falling back to per-prompt calls. Results keep prompt
+        order and land in the same response cache as _call.
+        """
+        results: List[Optional[str]] = [None] * len(prompts)
+        to_run = []
+        for i, prompt in enumerate(prompts):
+            key = self._raw_key(prompt)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                to_run.append((i, key, prompt))
+        if not to_run:
+            return results
+
+        outs = None
+        if self._api_client is not None:
+            outs = self._try_batch_api([p for _, _, p in to_run])
+        if outs is None:
+            outs = [
+                self._run_api(p) if self._api_client else self._run_cli(p)
+                for _, _, p in to_run
+            ]
+
+        for (i, key, _), out in zip(to_run, outs):
+            results[i] = out
+        self._cache_put_many((key, out) for (_, key, _), out in zip(to_run, outs))
+        return results
+
+    def _try_batch_api(self, prompts: List[str], poll_seconds: float = 5.0) -> Optional[List[str]]:
+        try:
+            job = self._api_client.batches.create(
+                model=self.model,
+                src=[
+                    {"contents": [{"role": "user", "parts": [{"text": p}]}]}
+                    for p in prompts
+                ],
+            )
+            while job.state.name in ("JOB_STATE_QUEUED", "JOB_STATE_PENDING", "JOB_STATE_RUNNING"):
+                time.sleep(poll_seconds)
+                job = self._api_client.batches.get(name=job.name)
+            if job.state.name != "JOB_STATE_SUCCEEDED":
+                print(f"Batch job ended in {job.state.name}, falling back")
+                return None
+            return [
+                (r.response.text or "").strip() if r.response else ""
+                for r in job.dest.inlined_responses
+            ]
+        except Exception as e:
+            print(f"Batch API unavailable, falling back to per-prompt calls: {e}")
+            return None
+
+    def batch_score_repos(self, jd_text: str, fingerprints: List[Dict], batch_id: str = "",
+                          batch_size: Optional[int] = None, mode: str = "interactive") -> List[Dict]:
+        """Sync wrapper around abatch_score_repos for non-async callers."""
+        return asyncio.run(self.abatch_score_repos(jd_text, fingerprints, batch_id=batch_id,
+                                                   batch_size=batch_size, mode=mode))
+
+    async def abatch_score_repos(self, jd_text: str, fingerprints: List[Dict], batch_id: str = "",
+                                 batch_size: Optional[int] = None, max_concurrency: int = 4,
+                                 mode: str = "interactive") -> List[Dict]:
         """
-        Scores many fingerprints with one LLM call per chunk.
-        Caches on (JD hash + each repo fingerprint hash) so repeated calls are cheap.
+        Scores many fingerprints with one LLM call per chunk; chunks are
+        dispatched concurrently (bounded by max_concurrency) so total
+        latency is ~ceil(chunks/max_concurrency) RTTs, not one per chunk.
+        Chunks are packed to a token budget by default so 50 small repos
+        ride in one request; pass batch_size for a fixed count instead.
+        mode="batch" routes cache-miss chunks through the Gemini Batch API
+        instead (cheaper tokens, no RPM pressure) — use it for offline/bulk
+        reprocessing where job-polling latency doesn't matter.
+        Caches on (JD key + each repo fingerprint hash) so reruns are cheap.
         """
         results: List[Dict] = []
-        jd_key = hashlib.sha1(jd_text.encode()).hexdigest()[:10]
-
-        # split into chunks
-        for i in range(0, len(fingerprints), batch_size):
-            chunk = fingerprints[i:i+batch_size]
-
-            # check cache per item first
-            to_score = []
-            cache_hits = {}
-            for fp in chunk:
-                name = fp.get("name", "repo")
-                pushed_at = fp.get("pushed_at", "")
-                fp_key = hashlib.sha1(json.dumps(fp, sort_keys=True).encode()).hexdigest()[:12]
-                cache_key = f"score:{jd_key}:{fp_key}:{name}"
-                if cache_key in self._cache:
-                    cache_hits[name] = self._cache[cache_key]
-                else:
-                    to_score.append((name, fp, cache_key))
-
-            if not to_score:
-                results.extend(cache_hits.values())
-                continue
+        jd_key = await self._ajd_key(jd_text)
+        if batch_size:
+            chunks = [fingerprints[i:i+batch_size] for i in range(0, len(fingerprints), batch_size)]
+        else:
+            chunks = list(_pack_chunks(fingerprints))
+
+        if mode == "batch" and self._api_client is not None:
+            for res in await self._score_chunks_batch(jd_text, jd_key, chunks):
+                results.extend(res)
+        else:
+            sem = asyncio.Semaphore(max_concurrency)
+
+            async def bounded(chunk):
+                async with sem:
+                    return await self._score_chunk(jd_text, jd_key, chunk)
+
+            for res in await asyncio.gather(*(bounded(c) for c in chunks), return_exceptions=True):
+                if isinstance(res, BaseException):
+                    print(f"Chunk scoring failed: {res}")
+                    continue
+                results.extend(res)
+
+        # keep order roughly by score desc (optional)
+        results.sort(key=lambda x: x.get("relevance_score", 0.0), reverse=True)
+        return results
+
+    async def _score_chunk(self, jd_text: str, jd_key: str, chunk: List[Dict]) -> List[Dict]:
+        cache_hits, to_score, prompt = self._prep_chunk(jd_text, jd_key, chunk)
+        if prompt is None:
+            return list(cache_hits.values())
+        if self._api_client is not None:
+            scored_list = await self._astream_json_list(prompt, fallback=[])
+        else:
+            scored_list = await self.agenerate_json(prompt, fallback=[])
+        return self._finish_chunk(cache_hits, to_score, scored_list)
+
+    async def _score_chunks_batch(self, jd_text: str, jd_key: str, chunks: List[List[Dict]]) -> List[List[Dict]]:
+        """
+        Offline path: every cache-miss chunk prompt goes into one Batch API
+        job. Polling runs in a worker thread so the event loop (and any other
+        pipeline sharing it) stays free; submission order doubles as the
+        custom-id so responses map straight back to their chunks.
+        """
+        prepped = [self._prep_chunk(jd_text, jd_key, c) for c in chunks]
+        prompts = [p for _, _, p in prepped if p is not None]
+        outs = await asyncio.to_thread(self._try_batch_api, prompts) if prompts else []
+
+        results: List[List[Dict]] = []
+        out_iter = iter(outs or [])
+        for cache_hits, to_score, prompt in prepped:
+            if prompt is None:
+                results.append(list(cache_hits.values()))
+            elif outs is None:
+                # batch job failed: degrade to the interactive call per chunk
+                scored_list = await self.agenerate_json(prompt, fallback=[])
+                results.append(self._finish_chunk(cache_hits, to_score, scored_list))
+            else:
+                scored_list = _json_safely(next(out_iter), fallback=[])
+                results.append(self._finish_chunk(cache_hits, to_score, scored_list))
+        return results
 
-            # batch prompt for the items that missed cache
-            payload = [fp for _, fp, _ in to_score]
-            prompt = f"""
+    def _prep_chunk(self, jd_text: str, jd_key: str, chunk: List[Dict]):
+        """Cache-splits one chunk; returns (cache_hits, to_score, prompt or None)."""
+        # check cache per item first
+        to_score = []
+        cache_hits = {}
+        for fp in chunk:
+            name = fp.get("name", "repo")
+            fp_key = _fp_hash(fp)
+            cache_key = f"score:{jd_key}:{fp_key}:{name}"
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                cache_hits[name] = cached
+            else:
+                to_score.append((name, fp, cache_key))
+
+        if not to_score:
+            return cache_hits, to_score, None
+
+        # batch prompt for the items that missed cache; idx is echoed back
+        # so a reordered response still maps to the right repo
+        payload = [_llm_payload(fp, i) for i, (_, fp, _) in enumerate(to_score)]
+        prompt = f"""
 You are a senior engineer + technical recruiter. Score each repository vs the JD.
 
 Job Description:
 {jd_text}
 
 Repositories (JSON list):
-{json.dumps(payload, indent=2)}
+{json_dumps(payload).decode()}
 
 Instructions:
-For each repo, return an array of JSON objects in the same order as input, one per repo, each with:
+For each repo, return an array of JSON objects, one per repo, each with:
 {{
+  "idx": <the input idx, echoed back>,
   "name": "<repo name>",
   "skills": ["list","key","skills"],
   "relevance_score": 0.0,
@@ -141,62 +771,46 @@ For each repo, return an array of JSON objects in the same order as input, one p
 }}
 Only return a valid JSON array.
 """
-            scored_list = self.generate_json(prompt, fallback=[])
-            if not isinstance(scored_list, list):
-                # hard fallback: naive zeros
-                for name, _, cache_key in to_score:
-                    item = {"name": name, "skills": [], "relevance_score": 0.0, "reasoning": "fallback"}
-                    self._cache[cache_key] = item
-                    results.append(item)
-                _save_cache(CACHE_FILE, self._cache)
-                results.extend(cache_hits.values())
-                continue
-
-            # write cache for new items, then append
-            for (name, _, cache_key), scored in zip(to_score, scored_list):
-                self._cache[cache_key] = scored
-                results.append(scored)
+        return cache_hits, to_score, prompt
 
-            # also add cache hits
+    def _finish_chunk(self, cache_hits: Dict, to_score: List, scored_list: Any) -> List[Dict]:
+        results: List[Dict] = []
+        if not isinstance(scored_list, list):
+            # hard fallback: naive zeros, short-lived so a later run re-scores
+            # instead of pinning 0.0 for the repo version forever
+            fallbacks = [
+                (cache_key, {"name": name, "skills": [], "relevance_score": 0.0, "reasoning": "fallback"})
+                for name, _, cache_key in to_score
+            ]
+            self._cache_put_many(fallbacks, ttl=NEG_TTL)
+            results.extend(item for _, item in fallbacks)
             results.extend(cache_hits.values())
-            _save_cache(CACHE_FILE, self._cache)
+            return results
 
-        # keep order roughly by score desc (optional)
-        results.sort(key=lambda x: x.get("relevance_score", 0.0), reverse=True)
+        # map responses back by echoed idx (position as fallback), write
+        # cache for new items in one transaction, then append; repos the
+        # model dropped from its reply get the same short-TTL fallback
+        by_idx = {}
+        for pos, item in enumerate(scored_list):
+            if isinstance(item, dict):
+                by_idx[item.get("idx", pos)] = item
+        to_put = []
+        to_put_neg = []
+        for i, (name, _, cache_key) in enumerate(to_score):
+            scored = by_idx.get(i)
+            if scored:
+                scored.pop("idx", None)
+                to_put.append((cache_key, scored))
+            else:
+                scored = {"name": name, "skills": [], "relevance_score": 0.0, "reasoning": "fallback"}
+                to_put_neg.append((cache_key, scored))
+            results.append(scored)
+        if to_put:
+            self._cache_put_many(to_put)
+        if to_put_neg:
+            self._cache_put_many(to_put_neg, ttl=NEG_TTL)
+        results.extend(cache_hits.values())
         return results
-    def __init__(self,api_key=None,model="gemini-2.5-pro"):
-        self.api_key = api_key
-        self.client = Client(api_key=self.api_key) if self.api_key else None
-        self.model = model
-
-    def generate(self,prompt:str)->str:
-        if self.client:
-            return self._call_api(prompt)
-        else:
-            return self._call_cli(prompt)
-    
-    def _call_api(self,prompt:str)->str:
-        if(self.client):
-            try:
-                response = self.client.models.generate_content(
-                    model = self.model,
-                    contents = prompt
-                )
-                return response.text.strip()
-            except Exception as e:
-                print(e);
-                raise e
 
-    def _call_cli(self,prompt:str)->str:
-        try:
-            result = subprocess.run(
-                ["gemini","-m",self.model,"-p",prompt],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip()
 
-        except Exception as e:
-            print(e.stderr)
-            raise e            
\ No newline at end of file
+__all__ = ["Gemini"]
\ No newline at end of file
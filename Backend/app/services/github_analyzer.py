@@ -1,3 +1,5 @@
+import asyncio
+import hashlib
 import httpx
 import time
 import json
@@ -8,14 +10,21 @@ import tempfile
 import shutil
 from typing import List, Dict, Optional, Tuple, Any
 from .gemini_client import Gemini
-from .code_extractors import summarize_repo_code
+from .code_extractors import summarize_repo_zip
 from .github_fetcher import GitHubFetcher
 
+# compiled once at import; the JD keyword fallback runs it on every JD
+_KW_RE = re.compile(r"\b[A-Za-z][A-Za-z0-9\.\+#-]+\b")
+
 class GitHubAnalyzer:
-    def __init__(self, llm_api_key: str, fetcher: GitHubFetcher, batch_size: int = 5):
+    def __init__(self, llm_api_key: str, fetcher: GitHubFetcher, batch_size: Optional[int] = None):
         self.gemini = Gemini(api_key=llm_api_key)
         self.fetcher = fetcher
         self.batch_size = batch_size
+        # per-JD skill lists, keyed by JD hash: the pre-filter asks for the
+        # same JD's skills on every call
+        self._jd_skills_cache: Dict[str, List[str]] = {}
+        self._jd_set_cache: Dict[str, frozenset] = {}
     
 
     async def pre_filter_repos(self, repos: list[dict], jd_text: str) -> list[dict]:
@@ -28,6 +37,10 @@ class GitHubAnalyzer:
         jd_skills = self._extract_skills_from_jd(jd_text)
         print(f"[JD Skills] {jd_skills}")
 
+        # lowered once per JD (memoized across calls); per-repo checks are
+        # one set intersection instead of O(|jd_skills|*|repo_skills|) scans
+        jd_skills_l = self._jd_skill_set(jd_text)
+
         filtered = []
         for repo in repos:
             owner = (repo.get("owner") or {}).get("login", "")
@@ -42,8 +55,8 @@ class GitHubAnalyzer:
                 languages = await self.fetcher.fetch_repo_languages(owner, name)
                 dependencies = await self.fetcher.fetch_repo_dependencies(owner, name)
 
-                repo_skills = set(languages.keys()) | set(dependencies.keys())
-                if any(skill.lower() in [s.lower() for s in repo_skills] for skill in jd_skills):
+                repo_skills_l = {s.lower() for s in languages} | {s.lower() for s in dependencies}
+                if jd_skills_l & repo_skills_l:
                     filtered.append(repo)
 
             except Exception as e:
@@ -54,9 +67,12 @@ class GitHubAnalyzer:
         return filtered
 
 
-    async def build_repo_fingerprint(self, repo: Dict) -> Dict:
+    async def build_repo_fingerprint(self, repo: Dict, jd_skills: Optional[frozenset] = None) -> Dict:
         """
         Stage 1: Build a JD-independent fingerprint. Cached by pushed_at.
+        When jd_skills is given, repos whose languages/dependencies share
+        nothing with the JD skip the zipball download + code scan and get
+        a minimal fingerprint (not cached — another JD may need the scan).
         """
         name = repo.get("name")
         owner = (repo.get("owner") or {}).get("login", "")
@@ -75,39 +91,57 @@ class GitHubAnalyzer:
             print(f"Cache hit: fingerprint for {owner}/{name}")
             return cached
 
-        # Lightweight API signals
-        readme = await self.fetcher.fetch_repo_readme(owner, name)
-        languages = await self.fetcher.fetch_repo_languages(owner, name)
-        dependencies = await self.fetcher.fetch_repo_dependencies(owner, name)
-        structure = await self.fetcher.fetch_repo_structure(owner, name)
-        
-        maturity = []
-        sl = [s.lower() for s in structure]
+        # Lightweight API signals: independent I/O, one gather
+        readme, languages, dependencies, structure = await asyncio.gather(
+            self.fetcher.fetch_repo_readme(owner, name),
+            self.fetcher.fetch_repo_languages(owner, name),
+            self.fetcher.fetch_repo_dependencies(owner, name),
+            self.fetcher.fetch_repo_structure(owner, name),
+        )
+
+        # one pass over structure instead of three any() scans
+        has_tests = has_docker = has_ci = False
+        for s in structure:
+            sl = s.lower()
+            has_tests = has_tests or sl.startswith("tests")
+            has_docker = has_docker or sl == "dockerfile" or sl.endswith("docker-compose.yml")
+            has_ci = has_ci or sl.startswith(".github")
+            if has_tests and has_docker and has_ci:
+                break
 
-        if any(s.startswith("tests") or s == "tests/" for s in structure):
+        maturity = []
+        if has_tests:
             maturity.append("Has tests")
-
-        if ("dockerfile" in sl) or ("dockerfile" in structure) or any(s.endswith("docker-compose.yml") for s in structure):
+        if has_docker:
             maturity.append("Dockerized")
-
-        if any(s.startswith(".github") for s in structure):
+        if has_ci:
             maturity.append("CI/CD enabled")
 
         # # TODO: to be removed
         # readme_summary = await self._summarize_readme(readme) if readme and len(readme) > 0 else ""
 
-        # Code-level extraction via zipball (fast, no git)
-        repo_dir = await self.fetcher.download_repo_zip(owner, name, ref=default_branch)
-
-        try:
-            code_summary = summarize_repo_code(repo_dir)
-        finally:
-            # cleanup temp dir root
+        # zero skill overlap → the expensive zipball + code scan can't
+        # change the outcome; ship a minimal fingerprint instead
+        skip_code = jd_skills is not None and not (
+            jd_skills & ({s.lower() for s in languages} | {s.lower() for s in dependencies})
+        )
+
+        # Code-level extraction straight from the zipball (fast, no git,
+        # no extracted tree to clean up)
+        code_summary = {}
+        if not skip_code:
+            zf = await self.fetcher.download_repo_zip(owner, name, ref=default_branch)
             try:
-                top = os.path.dirname(repo_dir)
-                shutil.rmtree(top, ignore_errors=True)
-            except Exception:
-                pass
+                # CPU-bound decompress+parse: off the loop so other repos'
+                # downloads keep flowing while this one is scanned
+                code_summary = await asyncio.to_thread(summarize_repo_zip, zf)
+            finally:
+                zip_path = zf.filename
+                zf.close()
+                try:
+                    os.unlink(zip_path)
+                except OSError:
+                    pass
 
         fingerprint = {
             "name": name,
@@ -118,39 +152,63 @@ class GitHubAnalyzer:
             "dependencies": dependencies,
             "structure": structure,
             "maturity": maturity,
-            "readme_excerpt": (readme[:4000] if readme else ""),
+            # slice only when actually oversized; short READMEs (the common
+            # case) are passed through without a copy
+            "readme_excerpt": (readme[:4000] if len(readme) > 4000 else readme) if readme else "",
             "code_summary": code_summary,
         }
 
-        self.fetcher.put_cache(cache_key, fingerprint)
+        if not skip_code:
+            self.fetcher.put_cache(cache_key, fingerprint)
         return fingerprint
 
     async def analyze_repos(self, repos: List[Dict], jd_text: str) -> List[Dict]:
         
-        # stage 1: fingerprints(JD-independent,persisted)
+        # stage 1: fingerprints(JD-independent,persisted) — all repos at once
+        jd_skills = self._jd_skill_set(jd_text)
+        results = await asyncio.gather(
+            *(self.build_repo_fingerprint(repo, jd_skills=jd_skills) for repo in repos),
+            return_exceptions=True,
+        )
         fingerprints:List[Dict] = []
-        for repo in repos:
-            fp = await self.build_repo_fingerprint(repo)
-            if len(fp) > 0:
+        for repo, fp in zip(repos, results):
+            if isinstance(fp, BaseException):
+                print(f"Fingerprint error for {repo.get('name')}: {fp}")
+            elif len(fp) > 0:
                 fingerprints.append(fp)
 
-        # stage 2: batch score against JD (LLM batching + internal caching)
-        scored = self.gemini.batch_score_repos(jd_text,fingerprints,batch_size=self.batch_size)
+        # stage 2: batch score against JD (concurrent LLM chunks + internal caching)
+        scored = await self.gemini.abatch_score_repos(jd_text,fingerprints,batch_size=self.batch_size)
 
         # sort by score desc
         scored.sort(key=lambda x: x.get("relevance_score", 0.0), reverse=True)
         
         return scored
 
+    def _jd_skill_set(self, jd_text: str) -> frozenset:
+        jd_h = hashlib.blake2b(jd_text.encode(), digest_size=8).hexdigest()
+        cached = self._jd_set_cache.get(jd_h)
+        if cached is None:
+            cached = self._jd_set_cache[jd_h] = frozenset(
+                s.lower() for s in self._extract_skills_from_jd(jd_text)
+            )
+        return cached
+
     def _extract_skills_from_jd(self,jd_text:str)->List[str]:
+        jd_h = hashlib.blake2b(jd_text.encode(), digest_size=8).hexdigest()
+        cached = self._jd_skills_cache.get(jd_h)
+        if cached is None:
+            cached = self._jd_skills_cache[jd_h] = self._extract_skills_uncached(jd_text)
+        return cached
+
+    def _extract_skills_uncached(self,jd_text:str)->List[str]:
         """
         Extract skills from the JD.
         - Uses LLM if available, else falls back to simple regex-based keywords.
         """
         if not self.gemini:
             # fallback simple keyword extraction
-            keywords = re.findall(r"\b[A-Za-z][A-Za-z0-9\.\+#-]+\b", jd_text)
-            return list(set(keywords))
+            return list(set(_KW_RE.findall(jd_text)))
 
         prompt = f"""
         Extract all technical skills, frameworks, libraries, and tools from this Job Description.
@@ -168,5 +226,4 @@ class GitHubAnalyzer:
             print(f"LLM JD skill extraction failed: {e}")
 
         # fallback if LLM fails
-        keywords = re.findall(r"\b[A-Za-z][A-Za-z0-9\.\+#-]+\b", jd_text)
-        return list(set(keywords))
\ No newline at end of file
+        return list(set(_KW_RE.findall(jd_text)))
\ No newline at end of file
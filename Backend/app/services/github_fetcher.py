@@ -1,6 +1,8 @@
+import asyncio
 import os
 import httpx
 import json
+import random
 import tempfile
 import time
 import os
@@ -9,180 +11,479 @@ import zipfile
 import shutil
 from typing import List, Dict, Optional, Tuple, Any
 from google.genai import Client
-from .code_extractors import _dedupe
+from .cache import _SqliteStore, json_dumps, json_loads
+from .code_extractors import _dedupe, _EXCLUDED_DIRS, _MAX_TEXT_BYTES
+from .dependency_extractor import DependencyExtractor
 
-CACHE_FILE = os.path.join(".cache", "github_cache.json")
-os.makedirs(".cache", exist_ok=True)
+CACHE_DB = os.path.join(".cache", "github_cache.sqlite")
+
+# READMEs only feed a 4000-char excerpt downstream; stop reading there
+_README_CAP = 16_384
+
+# structure listing keeps only these top-level marker files
+KEY_FILES = frozenset({
+    "dockerfile", "docker-compose.yml", "requirements.txt",
+    "package.json", "pom.xml", "build.gradle", "readme.md",
+})
+
+# manifest basenames worth pulling out of the repo tree
+_DEP_BASENAMES = frozenset(DependencyExtractor.DEP_FILES)
+
+# GraphQL aliases → manifest filenames (matches DependencyExtractor.DEP_FILES)
+_GQL_MANIFESTS = {
+    "packageJson": "package.json",
+    "requirementsTxt": "requirements.txt",
+    "pyprojectToml": "pyproject.toml",
+    "pipfile": "Pipfile",
+    "pomXml": "pom.xml",
+    "buildGradle": "build.gradle",
+    "cargoToml": "Cargo.toml",
+    "goMod": "go.mod",
+}
 
 class GitHubFetcher:
     BASE_URL = "https://api.github.com"
+    GRAPHQL_URL = "https://api.github.com/graphql"
 
     def __init__(self, token: Optional[str] = None):
         self.token = token
         self.headers = {"Authorization": f"token {self.token}"} if token else {}
-        self.cache: Dict[str, Any] = {}
-        if os.path.exists(CACHE_FILE):
-            try:
-                with open(CACHE_FILE, "r") as f:
-                    self.cache = json.load(f)
-            except Exception:
-                self.cache = {}
-
-    def _save_cache(self):
-        with open(CACHE_FILE, "w") as f:
-            json.dump(self.cache, f, indent=2)
-
-    async def fetch_user_repos(self, username: str) -> List[Dict]:
-        key = f"user_repos:{username}"
-        if key in self.cache:
-            print(f"Cache hit: repos for {username}")
-            return self.cache[key]
-        url = f"{self.BASE_URL}/users/{username}/repos?per_page=100&type=owner&sort=updated"
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(url, headers=self.headers)
+        # one client for every call: connections to api.github.com are
+        # kept alive instead of paying a TCP+TLS handshake per request
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=20,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        # bounded fan-out: gathers above can queue hundreds of requests;
+        # this caps what actually hits api.github.com at once
+        self._gh_sem = asyncio.Semaphore(16)
+        self.dep_extractor = DependencyExtractor()
+        # per-key sqlite store: startup no longer parses one monolithic
+        # JSON blob and each put writes O(entry), not O(cache)
+        self._store = _SqliteStore(CACHE_DB)
+        # in-flight requests by cache key: concurrent callers asking for
+        # the same uncached thing share one HTTP request
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # keys revalidated this run: later calls serve cache directly
+        # instead of re-sending If-None-Match every time
+        self._validated: set = set()
+        # epoch until which requests pause when the quota runs low
+        self._rl_pause_until = 0.0
+
+    # start throttling before the quota is actually gone
+    _RATELIMIT_FLOOR = 10
+    _MAX_RETRIES = 5
+    _MAX_BACKOFF = 120.0  # seconds
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        GET with rate-limit awareness: when X-RateLimit-Remaining runs
+        low every caller waits for the reset, and 429/403 rate-limit
+        responses are retried with exponential backoff + jitter.
+        """
+        delay = 1.0
+        for attempt in range(self._MAX_RETRIES):
+            pause = self._rl_pause_until - time.time()
+            if pause > 0:
+                await asyncio.sleep(min(pause, self._MAX_BACKOFF))
+            async with self._gh_sem:
+                resp = await self._client.get(url, **kwargs)
+
+            if resp.status_code in (429, 403):
+                retry_after = resp.headers.get("retry-after")
+                remaining = resp.headers.get("x-ratelimit-remaining")
+                if retry_after is None and remaining != "0":
+                    return resp  # plain forbidden, not a rate limit
+                if retry_after:
+                    wait = float(retry_after)
+                else:
+                    reset = float(resp.headers.get("x-ratelimit-reset") or 0)
+                    wait = reset - time.time()
+                if wait <= 0:
+                    wait = delay * (1 + random.random())
+                print(f"Rate limited; retrying in {wait:.1f}s")
+                await asyncio.sleep(min(wait, self._MAX_BACKOFF))
+                delay *= 2
+                continue
+
+            remaining = resp.headers.get("x-ratelimit-remaining")
+            if remaining is not None:
+                try:
+                    if int(remaining) < self._RATELIMIT_FLOOR:
+                        self._rl_pause_until = float(resp.headers.get("x-ratelimit-reset") or 0)
+                except ValueError:
+                    pass
+            return resp
+        return resp
+
+    async def _coalesce(self, key: str, fetch):
+        """Run `fetch()` once per key; concurrent callers await the same result."""
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await fut
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fetch()
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved even with no other waiters
+            raise
+        finally:
+            del self._inflight[key]
+
+    def _cached_etag_entry(self, key: str):
+        entry = self.get_cache(key)
+        if isinstance(entry, dict) and "etag" in entry and "data" in entry:
+            return entry["etag"], entry["data"]
+        return None, None
+
+    async def _get_revalidated(self, key: str, url: str, parse, default=None, **kwargs):
+        """
+        Conditional GET: cached entries carry the response ETag and are
+        revalidated once per run with If-None-Match. A 304 serves the
+        cached data without rate-limit cost or JSON parsing; a 200
+        replaces the entry. Network errors fall back to cached data.
+        """
+        etag, data = self._cached_etag_entry(key)
+        if data is not None and key in self._validated:
+            return data
+        headers = dict(kwargs.pop("headers", None) or {})
+        if etag:
+            headers["If-None-Match"] = etag
+        try:
+            resp = await self._get(url, headers=headers, **kwargs)
+        except Exception:
+            if data is not None:
+                return data
+            raise
+        if resp.status_code == 304:
+            print(f"Cache revalidated: {key}")
+            self._validated.add(key)
+            return data
+        if resp.status_code != 200:
+            if data is not None:
+                return data
+            if default is not None:
+                return default
             resp.raise_for_status()
-            repos = resp.json()
-        self.cache[key] = repos
-        self._save_cache()
-        return repos
+        data = parse(resp)
+        self.put_cache(key, {"etag": resp.headers.get("etag"), "data": data})
+        self._validated.add(key)
+        return data
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def fetch_user_repos(self, username: str, limit: Optional[int] = None) -> List[Dict]:
+        key = f"user_repos:{username}" + (f":{limit}" if limit else "")
+
+        async def _fetch():
+            # sort server-side by last push and only ask for what the
+            # pipeline will look at; per_page caps at 100 on GitHub's side
+            per_page = min(limit, 100) if limit else 100
+            url = (
+                f"{self.BASE_URL}/users/{username}/repos"
+                f"?per_page={per_page}&type=owner&sort=pushed&direction=desc"
+            )
+            repos = await self._get_revalidated(key, url, lambda r: json_loads(r.content))
+            return repos[:limit] if limit else repos
+
+        return await self._coalesce(key, _fetch)
 
     async def fetch_specific_repos(): pass
 
+    async def fetch_repos_bulk(self, owner: str, names: List[str]):
+        """
+        One GraphQL query pulls languages, README and manifest blobs for
+        many repos at once and drops them into the same cache keys the
+        REST paths use — later fetch_* calls hit cache instead of paying
+        4-5 round-trips per repo. No-op without a token (GraphQL needs
+        auth) or when everything is already cached; REST stays the
+        fallback for anything the query missed.
+        """
+        if not self.token or not names:
+            return
+        # one batched SELECT across all repos instead of a lookup per name
+        keys = {n: f"languages:{owner}/{n}" for n in names}
+        cached = self.get_cache_many(keys.values())
+        todo = [n for n in names if keys[n] not in cached]
+        if not todo:
+            return
+
+        fields = (
+            "languages(first: 20) { nodes { name } } "
+            'readme: object(expression: "HEAD:README.md") { ... on Blob { text } } '
+            + " ".join(
+                f'{alias}: object(expression: "HEAD:{fname}") {{ ... on Blob {{ text }} }}'
+                for alias, fname in _GQL_MANIFESTS.items()
+            )
+        )
+        query = "query($owner: String!) { " + " ".join(
+            f'r{i}: repository(owner: $owner, name: "{name}") {{ {fields} }}'
+            for i, name in enumerate(todo)
+        ) + " }"
+
+        try:
+            async with self._gh_sem:
+                resp = await self._client.post(
+                    self.GRAPHQL_URL,
+                    json={"query": query, "variables": {"owner": owner}},
+                )
+            if resp.status_code != 200:
+                return
+            data = (json_loads(resp.content) or {}).get("data") or {}
+        except Exception as e:
+            print(f"GraphQL bulk fetch failed: {e}")
+            return
+
+        for i, name in enumerate(todo):
+            node = data.get(f"r{i}")
+            if not node:
+                continue
+            langs = [n["name"] for n in ((node.get("languages") or {}).get("nodes") or [])]
+            self.put_cache(f"languages:{owner}/{name}", langs)
+            # the blob probes are exact-name and root-only: an unresolved
+            # README.md or zero matched manifests means "not found by this
+            # query", not "absent" — leave those keys for the REST paths
+            # (/readme resolves any name; the tree scan finds nested files)
+            readme = (node.get("readme") or {}).get("text")
+            if readme:
+                self.put_cache(f"readme:{owner}/{name}", readme[:_README_CAP])
+            deps = []
+            matched = False
+            for alias, fname in _GQL_MANIFESTS.items():
+                text = (node.get(alias) or {}).get("text")
+                if text:
+                    matched = True
+                    deps.extend(self.dep_extractor.extract_from_file(fname, text))
+            if matched:
+                self.put_cache(f"dependencies:{owner}/{name}", _dedupe(deps))
+
     async def fetch_repo_readme(self, owner: str, repo: str) -> str:
         key = f"readme:{owner}/{repo}"
-        if key in self.cache:
+        # bulk GraphQL warm-up writes the plain text under this key;
+        # serve it directly, it is fresh for this run
+        cached = self.get_cache(key)
+        if isinstance(cached, str):
             print(f"Cache hit: readme for {owner}/{repo}")
-            return self.cache[key]
-        url = f"{self.BASE_URL}/repos/{owner}/{repo}/readme"
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(url, headers={**self.headers, "Accept": "application/vnd.github.v3.raw"})
-            if resp.status_code == 200:
-                txt = resp.text
-                self.cache[key] = txt
-                self._save_cache()
-                return txt
-        return ""
+            return cached
+
+        async def _fetch():
+            etag, data = self._cached_etag_entry(key)
+            if data is not None and key in self._validated:
+                return data
+            url = f"{self.BASE_URL}/repos/{owner}/{repo}/readme"
+            headers = {"Accept": "application/vnd.github.v3.raw"}
+            if etag:
+                headers["If-None-Match"] = etag
+            # streamed with a byte cap: a huge README never lands in memory
+            # whole when only the excerpt is ever used
+            raw = bytearray()
+            async with self._gh_sem:
+                async with self._client.stream("GET", url, headers=headers) as resp:
+                    if resp.status_code == 304:
+                        print(f"Cache revalidated: {key}")
+                        self._validated.add(key)
+                        return data
+                    if resp.status_code != 200:
+                        return data if data is not None else ""
+                    new_etag = resp.headers.get("etag")
+                    async for chunk in resp.aiter_bytes(8192):
+                        raw.extend(chunk)
+                        if len(raw) >= _README_CAP:
+                            break
+            txt = raw[:_README_CAP].decode("utf-8", errors="ignore")
+            self.put_cache(key, {"etag": new_etag, "data": txt})
+            self._validated.add(key)
+            return txt
+
+        return await self._coalesce(key, _fetch)
 
     async def fetch_repo_languages(self, owner: str, repo: str) -> List[str]:
         key = f"languages:{owner}/{repo}"
-        if key in self.cache:
+        # bulk GraphQL warm-up writes the plain list under this key;
+        # serve it directly, it is fresh for this run
+        cached = self.get_cache(key)
+        if isinstance(cached, list):
             print(f"Cache hit: languages for {owner}/{repo}")
-            return self.cache[key]
-        url = f"{self.BASE_URL}/repos/{owner}/{repo}/languages"
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(url, headers=self.headers)
-            if resp.status_code == 200:
-                langs = list(resp.json().keys())
-                self.cache[key] = langs
-                self._save_cache()
-                return langs
-        return []
+            return cached
+
+        async def _fetch():
+            url = f"{self.BASE_URL}/repos/{owner}/{repo}/languages"
+            return await self._get_revalidated(
+                key, url, lambda r: list(json_loads(r.content).keys()), default=[]
+            )
+
+        return await self._coalesce(key, _fetch)
+
+    async def _fetch_repo_tree(self, owner: str, repo: str) -> Optional[List[Dict]]:
+        """
+        Full recursive tree listing, or None when unavailable or truncated
+        (huge repos). Not persisted — trees can be large — but coalesced,
+        so the concurrent structure and dependency fetches of one repo
+        share a single call.
+        """
+        async def _fetch():
+            url = f"{self.BASE_URL}/repos/{owner}/{repo}/git/trees/HEAD?recursive=1"
+            resp = await self._get(url)
+            if resp.status_code != 200:
+                return None
+            data = json_loads(resp.content)
+            if data.get("truncated"):
+                return None
+            return data.get("tree", [])
+
+        return await self._coalesce(f"tree:{owner}/{repo}", _fetch)
 
     async def fetch_repo_structure(self, owner: str, repo: str) -> List[str]:
         key = f"structure:{owner}/{repo}"
-        if key in self.cache:
+        cached = self.get_cache(key)
+        if cached is not None:
             print(f"Cache hit: structure for {owner}/{repo}")
-            return self.cache[key]
-        url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents"
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(url, headers=self.headers)
+            return cached
+
+        async def _fetch():
+            # whole tree in one request: /contents only lists the root level,
+            # so nested markers (tests/, .github/workflows/) were invisible
+            tree = await self._fetch_repo_tree(owner, repo)
+            if tree is not None:
+                structure = []
+                for node in tree:
+                    path = node.get("path", "")
+                    if node.get("type") == "tree":
+                        if "/" not in path:
+                            structure.append(path + "/")
+                        continue
+                    base = path.rsplit("/", 1)[-1].lower()
+                    if "/" not in path and base in KEY_FILES:
+                        structure.append(path)
+                    elif path.startswith((".github/", "tests/")) or base == "docker-compose.yml":
+                        structure.append(path)
+                self.put_cache(key, structure)
+                return structure
+
+            # truncated or failed tree: fall back to the root listing
+            url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents"
+            resp = await self._get(url)
             if resp.status_code != 200:
                 return []
-            items = resp.json()
+            items = json_loads(resp.content)
             structure = []
             for item in items:
                 if item["type"] == "dir":
                     structure.append(item["name"] + "/")
                 else:
-                    if item["name"].lower() in [
-                        "dockerfile", "docker-compose.yml", "requirements.txt",
-                        "package.json", "pom.xml", "build.gradle", "readme.md"
-                    ] or item["name"].startswith(".github"):
+                    if item["name"].lower() in KEY_FILES or item["name"].startswith(".github"):
                         structure.append(item["name"])
-        self.cache[key] = structure
-        self._save_cache()
-        return structure
+            self.put_cache(key, structure)
+            return structure
+
+        return await self._coalesce(key, _fetch)
 
     async def fetch_repo_dependencies(self, owner: str, repo: str) -> List[str]:
             key = f"dependencies:{owner}/{repo}"
-            if key in self.cache:
+            cached = self.get_cache(key)
+            if cached is not None:
                 print(f"Cache hit: dependencies for {owner}/{repo}")
-                return self.cache[key]
-            dependencies = []
-            files = ["package.json", "requirements.txt", "pyproject.toml", "Pipfile", "pom.xml", "build.gradle", "Cargo.toml", "go.mod"]
-            async with httpx.AsyncClient(timeout=20) as client:
-                for file in files:
-                    url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents/{file}"
-                    resp = await client.get(url, headers={**self.headers, "Accept": "application/vnd.github.v3.raw"})
-                    if resp.status_code != 200:
+                return cached
+            async def _fetch():
+                dependencies: set = set()
+                # the recursive tree finds manifests at any depth in one
+                # call; truncated/failed trees fall back to root probes
+                paths: Optional[List[str]] = None
+                tree = await self._fetch_repo_tree(owner, repo)
+                if tree is not None:
+                    paths = []
+                    for node in tree:
+                        if node.get("type") != "blob" or (node.get("size") or 0) > _MAX_TEXT_BYTES:
+                            continue
+                        parts = node.get("path", "").split("/")
+                        if parts[-1] in _DEP_BASENAMES and not any(p in _EXCLUDED_DIRS for p in parts[:-1]):
+                            paths.append(node["path"])
+                if paths is None:
+                    paths = list(DependencyExtractor.DEP_FILES)
+
+                # every manifest in flight at once; misses are just 404s
+                responses = await asyncio.gather(
+                    *(
+                        self._get(
+                            f"{self.BASE_URL}/repos/{owner}/{repo}/contents/{path}",
+                            headers={"Accept": "application/vnd.github.v3.raw"},
+                        )
+                        for path in paths
+                    ),
+                    return_exceptions=True,
+                )
+                for path, resp in zip(paths, responses):
+                    if isinstance(resp, BaseException) or resp.status_code != 200:
                         continue
-                    content = resp.text
-                    if file == "package.json":
-                        try:
-                            data = json.loads(content)
-                            deps = list(data.get("dependencies", {}).keys()) + list(data.get("devDependencies", {}).keys())
-                            dependencies.extend(deps)
-                        except Exception:
-                            pass
-                    elif file in ("requirements.txt", "Pipfile"):
-                        for line in content.splitlines():
-                            line = line.strip()
-                            if not line or line.startswith("#"): continue
-                            dependencies.append(re.split(r"[=<>!~ ]+", line)[0])
-                    elif file == "pyproject.toml":
-                        for line in content.splitlines():
-                            s = line.strip()
-                            if "=" in s and "[" not in s and not s.startswith("#"):
-                                dependencies.append(s.split("=")[0].strip().strip('"').strip("'"))
-                    elif file in ("pom.xml", "build.gradle"):
-                        for line in content.splitlines():
-                            if "<artifactId>" in line:
-                                m = re.search(r"<artifactId>(.*?)</artifactId>", line)
-                                if m: dependencies.append(m.group(1).strip())
-                            elif "implementation" in line or "api " in line:
-                                g = re.search(r"['\"]([A-Za-z0-9_.\-]+:[A-Za-z0-9_.\-]+)['\"]", line)
-                                if g: dependencies.append(g.group(1))
-                    else:
-                        dependencies.append(f"{file} present")
-            dependencies = _dedupe(dependencies)
-            self.cache[key] = dependencies
-            self._save_cache()
-            return dependencies
+                    fname = path.rsplit("/", 1)[-1]
+                    dependencies.update(self.dep_extractor.extract_from_file(fname, resp.text))
+                deps = sorted(dependencies)
+                self.put_cache(key, deps)
+                return deps
 
-    async def download_repo_zip(self, owner: str, repo: str, ref = None) -> str:
+            return await self._coalesce(key, _fetch)
+
+    async def download_repo_zip(self, owner: str, repo: str, ref = None) -> zipfile.ZipFile:
         """
-        Downloads repo zipball to a temp directory and returns the extracted path.
-        Uses GitHub zipball API (no git needed).
+        Streams the repo zipball to a single temp file and returns an open
+        ZipFile over it. Callers read entries straight out of the archive
+        (no extraction); close it and unlink `.filename` to release the
+        one file on disk. Uses GitHub zipball API (no git needed).
         """
         ref_part = f"/{ref}" if ref else ""
         url = f"{self.BASE_URL}/repos/{owner}/{repo}/zipball{ref_part}"
 
-        async with httpx.AsyncClient(follow_redirects=True,timeout=60) as client:
-            resp = await client.get(url, headers=self.headers)
-
-            # fallback to master branch
-            if respo.status_code == 404:
-                if ref == 'main':
-                    return await self.download_repo_zip(owner,repo,ref='master')
-
-            resp.raise_for_status()
-            tmp_dir = tempfile.mkdtemp(prefix=f"{owner}_{repo}_")
-            zip_path = os.path.join(tmp_dir, f"{repo}.zip")
+        fd, zip_path = tempfile.mkstemp(prefix=f"{owner}_{repo}_", suffix=".zip")
 
-            with open(zip_path, "wb") as f:
-                f.write(resp.content)
+        # stream straight to disk: the archive never sits in memory whole;
+        # on any failure the fd and temp file are released, not leaked
+        retry_master = False
+        try:
+            async with self._gh_sem:
+                async with self._client.stream("GET", url, timeout=60) as resp:
+                    # fallback to master branch
+                    if resp.status_code == 404 and ref == 'main':
+                        retry_master = True
+                    else:
+                        resp.raise_for_status()
+                        async for chunk in resp.aiter_bytes(65536):
+                            os.write(fd, chunk)
+        except BaseException:
+            os.close(fd)
+            os.unlink(zip_path)
+            raise
+        os.close(fd)
 
-            with zipfile.ZipFile(zip_path, "r") as zf:
-                zf.extractall(tmp_dir)
+        # recurse outside the semaphore so the slot is free again
+        if retry_master:
+            os.unlink(zip_path)
+            return await self.download_repo_zip(owner,repo,ref='master')
 
-            # GitHub wraps contents in a top folder; find it
-            entries = [os.path.join(tmp_dir, d) for d in os.listdir(tmp_dir)]
-            top = next((e for e in entries if os.path.isdir(e)), tmp_dir)
-            return top
+        try:
+            return zipfile.ZipFile(zip_path, "r")
+        except BaseException:
+            os.unlink(zip_path)
+            raise
 
     def put_cache(self, key: str, value: Any):
-        self.cache[key] = value
-        self._save_cache()
+        self._store.set(key, json_dumps(value), ttl=None)
 
     def get_cache(self, key: str, default=None):
-        return self.cache.get(key, default)
\ No newline at end of file
+        raw = self._store.get(key)
+        return default if raw is None else json_loads(raw)
+
+    def get_cache_many(self, keys) -> Dict[str, Any]:
+        return {k: json_loads(v) for k, v in self._store.get_many(keys).items()}
\ No newline at end of file
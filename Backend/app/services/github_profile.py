@@ -9,17 +9,37 @@ class GitHubProfileService:
     Complete service: fetch → fingerprint (cache) → batch-score (LLM) → resume sections.
     Automatically re-fingerprints if repo was updated (cache key uses pushed_at).
     """
-    def __init__(self, token: Optional[str] = None, llm_api_key: Optional[str] = None, batch_size: int = 5):
+    def __init__(self, token: Optional[str] = None, llm_api_key: Optional[str] = None,
+                 batch_size: Optional[int] = None, repo_limit: Optional[int] = None):
         self.fetcher = GitHubFetcher(token)
         self.analyzer = GitHubAnalyzer(llm_api_key, self.fetcher, batch_size=batch_size)
         self.resume_builder = ResumeBuilder(llm_api_key)
+        # cap on repos considered, newest pushes first (None = GitHub's page cap)
+        self.repo_limit = repo_limit
+
+    async def aclose(self):
+        await self.fetcher.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
 
     async def build_profile(self, username: str, jd_text: str) -> Dict:
-        repos = await self.fetcher.fetch_user_repos(username)
+        repos = await self.fetcher.fetch_user_repos(username, limit=self.repo_limit)
 
         # TODO: remove repos which haven't any name or owner(invalid repos)
         repos = [r for r in repos if not r.get("fork") and not r.get("archived")]
 
+        # de-dup by full_name in one insertion-ordered dict pass; a repo
+        # listed twice would otherwise be fingerprinted and scored twice
+        repos = list({r.get("full_name") or r.get("name"): r for r in repos}.values())
+
+        # warm languages/readme/dependencies for every repo in one GraphQL
+        # round-trip; the per-repo fetches below then hit cache
+        await self.fetcher.fetch_repos_bulk(username, [r["name"] for r in repos if r.get("name")])
+
         # 2-way filtering
         # fetching only repos which are provided in repos.json
         # otherwise filtering based on required skills
@@ -27,7 +47,7 @@ class GitHubProfileService:
         # here repos will be filtered according to JD's required skills
         filtered_repos = await self.analyzer.pre_filter_repos(repos,jd_text)
 
-        # analyze (n repos → ~n/batch_size LLM calls)
+        # analyze (token-budget packing collapses n repos into a few LLM calls)
         projects = await self.analyzer.analyze_repos(filtered_repos, jd_text)
 
         # aggregate skills from scored projects
@@ -44,5 +64,5 @@ class GitHubProfileService:
             "stats": {"public_repos": len(repos)},
         }
 
-        profile["resume_ready"] = self.resume_builder.build_resume_sections(profile, jd_text)
+        profile["resume_ready"] = await self.resume_builder.abuild_resume_sections(profile, jd_text)
         return profile
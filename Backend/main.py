@@ -2,6 +2,11 @@ import asyncio
 import json
 import os
 from app.services.github_profile import GitHubProfileService
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,11 +19,15 @@ jd_text = """
 """
 
 async def main():
-    service = GitHubProfileService(token=GITHUB_TOKEN, llm_api_key=None)
-
-    profile = await service.build_profile(USERNAME, jd_text)
+    async with GitHubProfileService(token=GITHUB_TOKEN, llm_api_key=GEMINI_API_KEY) as service:
+        profile = await service.build_profile(USERNAME, jd_text)
     # print(profile)
-    with open('output/profile.json','w') as f:
-        json.dump(profile,f,indent=4)
+    # orjson serializes straight to bytes (no intermediate str assembly);
+    # stdlib json stays as the fallback when it isn't installed
+    with open('output/profile.json','wb') as f:
+        if orjson is not None:
+            f.write(orjson.dumps(profile, option=orjson.OPT_INDENT_2))
+        else:
+            f.write(json.dumps(profile, indent=2).encode())
 
 asyncio.run(main())